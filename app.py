@@ -22,18 +22,26 @@ limitations under the License.
 
 import os
 import sys
+import argparse
+import json
 
 import multiprocessing
+import multiprocessing.connection
+import threading
+import queue
+import signal
 import importlib
 import datetime
 import copy
 import imp
+import traceback
 
 import time
 import xml.etree.ElementTree as ET
 
 import result as rslt
 import script
+import paramxml
 
 extended_path_list = []
 
@@ -150,30 +158,76 @@ class MultiProcess(multiprocessing.Process):
 
 # cmd_line_target_dirs = [SUITES_DIR, TESTS_DIR, SCRIPTS_DIR]
 
-def process_run(filename, env, config, params, lib_path, conn):
+def script_run(filename, env, config, params, conn):
     name = script_path = None
     try:
-        sys.stdout = sys.stderr = open(os.path.join(trace_dir(), 'sunssvp_script.log'), "w")
         script_path, name = os.path.split(filename)
         name, ext = os.path.splitext(name)
-        if lib_path is not None:
-            sys.path.insert(0, lib_path)
         sys.path.insert(0, script_path)
+        m = importlib.import_module(name)
+        info = m.script_info()
+        test_script = RunScript(env=env, info=info, config=config, config_file=None, params=params, conn=conn)
         try:
-            m = importlib.import_module(name)
-            info = m.script_info()
-            test_script = RunScript(env=env, info=info, config=config, config_file=None, params=params, conn=conn)
             m.run(test_script)
-        except Exception as e:
-            raise e
+        finally:
+            test_script.close()
     finally:
+        # only the test script module is dropped, library modules stay loaded for the next job
         if name in sys.modules:
             del sys.modules[name]
-        if sys.path[0] == script_path:
+        if sys.path and sys.path[0] == script_path:
             del sys.path[0]
+
+def process_run(filename, env, config, params, lib_path, conn):
+    try:
+        sys.stdout = sys.stderr = open(os.path.join(trace_dir(), 'sunssvp_script.log'), "w")
+        if lib_path is not None:
+            sys.path.insert(0, lib_path)
+        script_run(filename, env, config, params, conn)
+    finally:
         if lib_path is not None and sys.path[0] == lib_path:
             del sys.path[0]
 
+def worker_run(lib_path, conn, recycle=None, slot=0):
+    """ Long lived worker loop, runs job requests received on conn until told to exit or the recycle count is
+    reached.
+    """
+    if slot:
+        trace_file = 'sunssvp_script_%d.log' % (slot)
+    else:
+        trace_file = 'sunssvp_script.log'
+    sys.stdout = sys.stderr = open(os.path.join(trace_dir(), trace_file), "w")
+    # interrupts are handled by the app, which stops running jobs through the connection
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if lib_path is not None:
+        sys.path.insert(0, lib_path)
+    jobs = 0
+    while recycle is None or jobs < recycle:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            break
+        if not isinstance(msg, dict):
+            continue
+        op = msg.get('op')
+        if op == RUN_MSG_CMD and msg.get('cmd') == RUN_MSG_CMD_EXIT:
+            break
+        elif op == RUN_MSG_JOB:
+            # stale commands or acks from a previous job are ignored above
+            error = None
+            try:
+                script_run(msg.get('filename'), msg.get('env'), msg.get('config'), msg.get('params'), conn)
+            except SystemExit as e:
+                # scripts end with sys.exit(rc), a non-zero exit fails the job as a non-zero process exit code did
+                if e.code is not None and e.code != 0:
+                    error = 'Script exit: {}'.format(e.code)
+            except Exception as e:
+                traceback.print_exc()
+                error = str(e)
+            sys.stdout.flush()
+            jobs += 1
+            conn.send({'op': RUN_MSG_JOB_DONE, 'error': error, 'jobs': jobs})
+
 
 class LogEntry(object):
     def __init__(self, message, level=script.INFO, timestamp=None):
@@ -204,6 +258,7 @@ SUITE_ROOT = 'suite'
 SUITE_ATTR_NAME = 'name'
 SUITE_ATTR_TYPE = 'type'
 SUITE_ATTR_GLOBALS = 'globals'
+SUITE_ATTR_WORKERS = 'workers'
 SUITE_PARAMS = 'params'
 SUITE_PARAM = 'param'
 SUITE_MEMBERS = 'members'
@@ -230,10 +285,54 @@ def member_update(path, old_name, new_name):
     except Exception as e:
         raise SVPError('Error on member update - directory %s: %s' % (path, str(e)))
 
+# suite member lists and test script names by file name, and the param groups and logos each script contributes to
+# merged suite param defs by script path, reused while the files they were read from are unchanged
+suite_merge_cache = {}
+script_merge_cache = {}
+
+def suite_members(filename):
+    signature = script.file_signature(filename)
+    entry = suite_merge_cache.get(filename)
+    if entry is not None and entry[0] == signature:
+        return entry[1]
+    members = list(Suite(filename=filename).members)
+    suite_merge_cache[filename] = (signature, members)
+    return members
+
+def test_script_name(filename):
+    signature = script.file_signature(filename)
+    entry = suite_merge_cache.get(filename)
+    if entry is not None and entry[0] == signature:
+        return entry[1]
+    script_name = script.ScriptConfig(filename=filename).script
+    suite_merge_cache[filename] = (signature, script_name)
+    return script_name
+
+def script_merge_contribution(script_name, working_dir, lib_signature):
+    """ Global param groups and logos a script contributes to the param defs of a suite.
+    """
+    script_path = os.path.join(working_dir, SCRIPTS_DIR, os.path.normpath(script_name))
+    signature = (script.file_signature(script_path), lib_signature)
+    entry = script_merge_cache.get(script_path)
+    if entry is not None and entry[0] == signature:
+        return entry[1]
+
+    lib_path = os.path.join(working_dir, LIB_DIR)
+    test_script = script.load_script(script_path, lib_path, path_list = extended_path_list)
+    groups = []
+    if test_script.param_defs is not None:
+        for group in test_script.param_defs.param_groups:
+            if test_script.param_is_global(group.name):
+                groups.append(group)
+    contribution = (groups, list(test_script.info.logos))
+    script_merge_cache[script_path] = (signature, contribution)
+    return contribution
+
 class Suite(object):
     def __init__(self, name=None, desc=None, filename=None, parent=None):
         self.name = name
         self.globals = True
+        self.workers = 1
         self.desc = desc
         self.filename = filename
         self.members = []
@@ -278,37 +377,38 @@ class Suite(object):
             self.members = members
             self.to_xml_file()
 
-    def merge_suite(self, suite, working_dir):
-        for m in suite.members:
+    def merge_suite(self, suite, working_dir, lib_signature=None):
+        if lib_signature is None:
+            lib_signature = script.lib_signature(os.path.join(working_dir, LIB_DIR))
+        self.merge_members(suite.members, working_dir, lib_signature)
+
+    def merge_members(self, members, working_dir, lib_signature):
+        for m in members:
           try:
             if is_suite_file(m):
                 filename = os.path.join(working_dir, SUITES_DIR, os.path.normpath(m))
-                member_suite = Suite(filename=filename)
-                self.merge_suite(member_suite, working_dir)
+                self.merge_members(suite_members(filename), working_dir, lib_signature)
             elif is_test_file(m):
                 filename = os.path.join(working_dir, TESTS_DIR, os.path.normpath(m))
                 # print 'merge file: ', filename
-                script_config = script.ScriptConfig(filename=filename)
-                if script_config.script not in self.scripts:
-                    self.scripts.append(script_config.script)
-                    script_path = os.path.join(working_dir, SCRIPTS_DIR, os.path.normpath(script_config.script))
-                    lib_path = os.path.join(working_dir, LIB_DIR)
-                    test_script = script.load_script(script_path, lib_path, path_list = extended_path_list)
-                    if test_script.param_defs is not None:
-                        for group in test_script.param_defs.param_groups:
-                            if test_script.param_is_global(group.name):
-                                if self.param_defs.param_group_find(group.name) is None:
-                                    self.param_defs.param_groups.append(group)
+                script_name = test_script_name(filename)
+                if script_name not in self.scripts:
+                    self.scripts.append(script_name)
+                    groups, logos = script_merge_contribution(script_name, working_dir, lib_signature)
+                    for group in groups:
+                        if self.param_defs.param_group_find(group.name) is None:
+                            # cached groups are shared, suite param defs get resolved in place
+                            self.param_defs.param_groups.append(copy.deepcopy(group))
 
                     # merge logos while we are at it
-                    for logo in test_script.info.logos:
+                    for logo in logos:
                         if logo not in self.logos:
                             self.logos.append(logo)
             else:
                 ### log
                 pass
           except Exception as e:
-              print ("{}".format(e))
+              print ("{}".format(e), file=sys.stderr)
 
     def merge_param_defs(self, working_dir):
         # print 'working_dir =', working_dir
@@ -366,6 +466,12 @@ class Suite(object):
         globals = element.attrib.get(SUITE_ATTR_GLOBALS)
         if globals == 'False':
             self.globals = False
+        workers = element.attrib.get(SUITE_ATTR_WORKERS)
+        if workers is not None:
+            try:
+                self.workers = max(int(workers), 1)
+            except ValueError:
+                raise SVPError('Invalid suite workers value: %s' % (workers))
 
         for e in element.findall('*'):
             if e.tag == SUITE_MEMBERS:
@@ -375,7 +481,7 @@ class Suite(object):
                         if name:
                             self.members.append(name)
 
-        script.params_from_xml(self.params, element)
+        paramxml.params_from_xml(self.params, element)
 
     def to_xml(self, parent=None, filename=None):
         attr = {}
@@ -385,6 +491,9 @@ class Suite(object):
         if self.globals is not None:
             attr[SUITE_ATTR_GLOBALS] = str(self.globals)
 
+        if self.workers > 1:
+            attr[SUITE_ATTR_WORKERS] = str(self.workers)
+
         if parent is not None:
             e = ET.SubElement(parent, SUITE_ROOT, attrib=attr)
         else:
@@ -395,7 +504,7 @@ class Suite(object):
             attr = {SUITE_ATTR_NAME: m}
             ET.SubElement(e_members, SUITE_MEMBER, attrib=attr)
 
-        script.params_to_xml(self.params, e)
+        paramxml.params_to_xml(self.params, e)
 
         return e
 
@@ -424,14 +533,28 @@ class Suite(object):
 RUN_MSG_ALERT = 'alert'
 RUN_MSG_CONFIRM = 'confirm'
 RUN_MSG_LOG = 'log'
+RUN_MSG_LOG_BATCH = 'log_batch'
 RUN_MSG_RESULT = 'result'
 RUN_MSG_RESULT_FILE = 'result_file'
 RUN_MSG_STATUS = 'status'
 RUN_MSG_CMD = 'cmd'
+RUN_MSG_JOB = 'job'
+RUN_MSG_JOB_DONE = 'job_done'
 
 RUN_MSG_CMD_PAUSE = 'pause'
 RUN_MSG_CMD_RESUME = 'resume'
 RUN_MSG_CMD_STOP = 'stop'
+RUN_MSG_CMD_EXIT = 'exit'
+
+# script log entries are sent to the app in batches, flushed when the batch is full or by a timer at most the
+# interval after the first pending entry, the log file is flushed with each batch
+LOG_BATCH_SIZE = 100
+LOG_BATCH_INTERVAL = .1
+LOG_FILE_BUFFER = 64 * 1024
+
+# seconds a script waits for outstanding acknowledgements when it ends, and for an answer to a confirm request
+ACK_WAIT_TIMEOUT = 5
+CONFIRM_TIMEOUT = 1000
 
 class RunScript(script.Script):
     def __init__(self, env=None, info=None, config=None, config_file=None, params=None, conn=None):
@@ -442,142 +565,175 @@ class RunScript(script.Script):
         self._results_dir = env.get('results_dir', '')
         self._result_dir = env.get('result_dir', '')
         self._log_file = os.path.join(self._results_dir, env.get('result_log_file'))
-
-    def conn_msg(self):
-        msg = None
+        self._log_fd = None
+        self._log_batch = []
+        # pending log entries are flushed from a timer thread, sends on the connection are serialized with it
+        self._log_timer = None
+        self._log_lock = threading.RLock()
+        self._msg_id = 0
+        # requests sent to the app and not yet acknowledged, by message id
+        self._pending = {}
+        # messages received while waiting for an acknowledgement, handed out by conn_msg()
+        self._inbox = []
+
+    def conn_recv(self, timeout=0):
+        # next message from the app, acknowledgements of pending requests are consumed here
         try:
-            if self._conn:
-                if self._conn.poll() is True:
-                    msg = self._conn.recv()
+            if self._conn and self._conn.poll(timeout) is True:
+                msg = self._conn.recv()
+                if isinstance(msg, dict) and msg.get('id') in self._pending:
+                    del self._pending[msg.get('id')]
+                return msg
         except Exception as e:
             raise SVPError('Conn msg error: {}'.format (e))
 
-        return msg
+    def conn_msg(self, timeout=0):
+        if self._inbox:
+            return self._inbox.pop(0)
+        end_time = time.time() + timeout
+        while True:
+            msg = self.conn_recv(timeout)
+            if msg is None or not isinstance(msg, dict) or msg.get('id') is None:
+                return msg
+            timeout = max(end_time - time.time(), 0)
+
+    def request(self, msg, ack=True):
+        """ Send a request to the app and return its message id. When ack is False the app does not acknowledge
+        the request.
+        """
+        self._msg_id += 1
+        msg['id'] = self._msg_id
+        if ack:
+            self._pending[self._msg_id] = msg.get('op')
+        else:
+            msg['ack'] = False
+        self.conn_send(msg)
+        return self._msg_id
+
+    def ack_wait(self, msg_id=None, timeout=ACK_WAIT_TIMEOUT):
+        """ Wait for the acknowledgement of a request, or of all pending requests if no id is given. Returns the
+        acknowledgement message for a single request, None on timeout.
+        """
+        end_time = time.time() + timeout
+        while self._pending:
+            if msg_id is not None and msg_id not in self._pending:
+                break
+            remaining = end_time - time.time()
+            if remaining <= 0:
+                break
+            msg = self.conn_recv(remaining)
+            if isinstance(msg, dict) and msg.get('id') is not None:
+                if msg.get('id') == msg_id:
+                    return msg
+            elif msg is not None:
+                self._inbox.append(msg)
+
+    def close(self):
+        self.log_flush()
+        if self._conn:
+            self.ack_wait()
+        with self._log_lock:
+            self.log_flush()
+            if self._log_fd is not None:
+                self._log_fd.close()
+                self._log_fd = None
 
     def alert(self, message):
-        self._conn.send({'op': RUN_MSG_ALERT,
-                         'message': message})
+        self.request({'op': RUN_MSG_ALERT,
+                      'message': message}, ack=False)
 
     def confirm(self, message):
         result = False
 
-        self._conn.send({'op': RUN_MSG_CONFIRM,
-                         'message': message})
-
-        seconds = 1000
-        while seconds > 0:
-            msg = self.conn_msg()
-            if msg is None:
-                time.sleep(.1)
-                seconds -= .1
-            elif isinstance(msg, dict):
-                if  msg.get('op') == RUN_MSG_CONFIRM:
-                    result = msg.get('result', False)
-                break
+        msg_id = self.request({'op': RUN_MSG_CONFIRM,
+                               'message': message})
+        msg = self.ack_wait(msg_id, timeout=CONFIRM_TIMEOUT)
+        if msg is not None:
+            result = msg.get('result', False)
 
         return result
 
     def log(self, message, level=script.INFO):
         entry = LogEntry(message, level=level)
-        if self._log_file is not None:
-            log_file = open(self._log_file, 'a')
-            log_file.write('%s\n' % (str(entry)))
-            log_file.close()
-        if self._conn:
-            self._conn.send({'op': RUN_MSG_LOG,
-                             'timestamp': entry.timestamp_str(),
-                             'level': entry.level,
-                             'message': entry.message})
+        with self._log_lock:
+            if self._log_file is not None:
+                if self._log_fd is None:
+                    self._log_fd = open(self._log_file, 'a', buffering=LOG_FILE_BUFFER)
+                self._log_fd.write('%s\n' % (str(entry)))
+            if self._conn:
+                self._log_batch.append((entry.timestamp_str(), entry.level, entry.message))
+            if len(self._log_batch) >= LOG_BATCH_SIZE:
+                self.log_flush()
+            elif self._log_timer is None:
+                # entries are out within the batch interval even when the script blocks after logging
+                self._log_timer = threading.Timer(LOG_BATCH_INTERVAL, self.log_flush)
+                self._log_timer.daemon = True
+                self._log_timer.start()
+
+    def log_flush(self):
+        with self._log_lock:
+            if self._log_timer is not None:
+                self._log_timer.cancel()
+                self._log_timer = None
+            if self._log_fd is not None:
+                self._log_fd.flush()
+            if self._log_batch and self._conn:
+                self._conn.send({'op': RUN_MSG_LOG_BATCH,
+                                 'entries': self._log_batch})
+                self._log_batch = []
+
+    def conn_send(self, msg):
+        # pending log entries go out first so the app sees them in order
+        with self._log_lock:
+            self.log_flush()
+            self._conn.send(msg)
 
     def result(self, status=None, params=None):
         self.log('Test result - %s' % (script.result_str(status)))
 
-        self._conn.send({'op': RUN_MSG_RESULT,
-                         'status': status,
-                         'params': params})
-
-        # wait for confirmation of completion
-        seconds = 5
-        while seconds > 0:
-            msg = self.conn_msg()
-            if msg is None:
-                time.sleep(.1)
-                seconds -= .1
-            elif isinstance(msg, dict):
-                if  msg.get('op') == RUN_MSG_RESULT:
-                    break
+        # acknowledged asynchronously, outstanding acknowledgements are collected when the script ends
+        self.request({'op': RUN_MSG_RESULT,
+                      'status': status,
+                      'params': params})
 
-    def result_file(self, name=None, status=None, params=None):
-
-        self._conn.send({'op': RUN_MSG_RESULT_FILE,
-                         'name': name,
-                         'status': status,
-                         'params': params})
-
-        # wait for confirmation of completion
-        seconds = 5
-        while seconds > 0:
-            msg = self.conn_msg()
-            if msg is None:
-                time.sleep(.1)
-                seconds -= .1
-            elif isinstance(msg, dict):
-                if  msg.get('op') == RUN_MSG_RESULT_FILE:
-                    break
+    def result_file(self, name=None, status=None, params=None, ack=True):
+        self.request({'op': RUN_MSG_RESULT_FILE,
+                      'name': name,
+                      'status': status,
+                      'params': params}, ack=ack)
 
     def result_file_path(self, name):
         return os.path.join(self._results_dir, self._result_dir, name)
 
-    def sleep(self, seconds):
-        if self.callback is True:
-            raise script.ScriptError('Can not call sleep() from callback function')
-        current_time = time.time()
-        wake_time = current_time + seconds
-        while wake_time > current_time:
-            sleep_time = .5
-            # service timers
-            timers = list(self.timers)
-            for t in timers:
-                next = round(t.next_timeout - current_time, 3)
-                if next <= 0:
-                    self.callback = True
-                    t.callback(t.arg)
-                    self.callback = False
-                    if t.repeating is False:
-                        self.timer_cancel(t)
-                    else:
-                        t.next_timeout += t.period
-                        next = round(t.next_timeout - current_time, 3)
-                if next < sleep_time:
-                    sleep_time = next
-
-            # service messages
-            msg = self.conn_msg()
-            if msg is not None:
-                if isinstance(msg, dict):
-                    if msg.get('op') == RUN_MSG_CMD:
-                        self.log('message: %s' % msg)
-                        if msg.get('cmd') == RUN_MSG_CMD_STOP:
-                            raise script.ScriptError('Commanded stop')
-                        elif msg.get('cmd') == RUN_MSG_CMD_PAUSE:
-                            self._conn.send(msg)
-                            paused = True
-                            while paused:
-                                msg = self.conn_msg()
-                                if msg is None:
-                                    time.sleep(.1)
-                                    # seconds -= .1
-                                elif msg.get('cmd') == RUN_MSG_CMD_RESUME:
-                                    self._conn.send(msg)
-                                    break
-                # elif isinstance(msg, Confirm):
-                #     return msg
-                # elif isinstance(msg, Alert):
-                #     return msg
-
-            if sleep_time > 0:
-                time.sleep(sleep_time)
-            current_time = time.time()
+    def sleep_wait(self, timeout):
+        # pending log entries go out before waiting
+        self.log_flush()
+        if not self._conn:
+            time.sleep(timeout)
+            return
+
+        # wait on the connection so a command from the app ends the wait as soon as it arrives
+        msg = self.conn_msg(timeout=timeout)
+        if msg is not None:
+            if isinstance(msg, dict):
+                if msg.get('op') == RUN_MSG_CMD:
+                    self.log('message: %s' % msg)
+                    if msg.get('cmd') == RUN_MSG_CMD_STOP:
+                        raise script.ScriptError('Commanded stop')
+                    elif msg.get('cmd') == RUN_MSG_CMD_PAUSE:
+                        self.conn_send(msg)
+                        paused = True
+                        while paused:
+                            msg = self.conn_msg(timeout=.1)
+                            if msg is None:
+                                pass
+                            elif msg.get('cmd') == RUN_MSG_CMD_RESUME:
+                                self.conn_send(msg)
+                                break
+            # elif isinstance(msg, Confirm):
+            #     return msg
+            # elif isinstance(msg, Alert):
+            #     return msg
 
 '''
 PROC_STATE_RUNNING = 1
@@ -598,7 +754,172 @@ def makedirs(path):
 def result_file_name(name):
     return name.replace(script.PATH_SEP, '__')
 
-PERIODIC_RECV_LIMIT = 10
+# time spent draining each worker connection per periodic call
+PERIODIC_RECV_TIME = .1
+# jobs run by a worker process before it is replaced by a fresh one
+WORKER_RECYCLE_JOBS = 25
+
+class RunWorker(object):
+    """ Long lived execution process that runs suite members as jobs, along with the result entry of the job it is
+    currently running.
+    """
+    def __init__(self, lib_path=None, recycle=None, slot=0):
+        self.lib_path = lib_path
+        self.recycle = recycle
+        self.slot = slot
+        self.jobs = 0
+        self.result = None
+        self.result_dir = ''
+        self.process = None
+        self.test_conn = None
+        self.app_conn = None
+        # reason the process could not be started, reported by the run context
+        self.error = None
+
+    def is_alive(self):
+        if self.process is not None:
+            return self.process.is_alive()
+        return False
+
+    def is_busy(self):
+        return self.result is not None
+
+    def is_spent(self):
+        return self.recycle is not None and self.jobs >= self.recycle
+
+    def start(self):
+        try:
+            self.test_conn, self.app_conn = multiprocessing.Pipe()
+        except Exception as e:
+            self.error = 'Error creating execution context pipe: {}'.format(e)
+
+        try:
+            self.process = MultiProcess(name='svp_process', target=worker_run, args=(self.lib_path, self.test_conn,
+                                                                                     self.recycle, self.slot))
+            self.process.start()
+        except Exception as e:
+            # raise
+            self.error = 'Error creating execution context process: {}'.format(e)
+            try:
+                if self.process:
+                    self.process.terminate()
+                    # self.process.join(timeout=0)
+            except Exception as e:
+                pass
+
+            self.process = None
+
+    def run(self, result, result_dir, filename, env=None, config=None, params=None):
+        self.result = result
+        self.result_dir = result_dir
+        self.jobs += 1
+        self.app_conn.send({'op': RUN_MSG_JOB,
+                            'filename': filename,
+                            'env': env,
+                            'config': config,
+                            'params': params})
+
+    def job_done(self):
+        self.result = None
+        self.result_dir = ''
+
+    def shutdown(self):
+        try:
+            if self.app_conn is not None and self.is_alive():
+                self.app_conn.send({'op': RUN_MSG_CMD,
+                                    'cmd': RUN_MSG_CMD_EXIT})
+        except Exception as e:
+            pass
+        self.close()
+
+    def terminate(self):
+        if self.process and self.process.is_alive():
+            # ### send stop signal to process, stop forcefully for now
+            try:
+                self.process.terminate()
+            except Exception as e:
+                print ('Process termination error: {}'.format(e), file=sys.stderr)
+
+    def close(self):
+        try:
+            if self.test_conn is not None:
+                self.test_conn.close()
+                self.test_conn = None
+            if self.app_conn is not None:
+                self.app_conn.close()
+                self.app_conn = None
+        except Exception as e:
+            pass
+
+        try:
+            if self.process:
+                self.process.join(timeout=0)
+        except Exception as e:
+            pass
+
+
+# upper bound on how long the supervisor waits before servicing the run context anyway
+SUPERVISOR_TIMEOUT = 1.0
+
+class RunSupervisor(threading.Thread):
+    """ Background thread that blocks on the worker connections and process sentinels of a run context and hands
+    servicing of the run context to dispatch() whenever one of them is ready. dispatch() must run the callable it is
+    given on the thread that owns the run context (wx.CallAfter in the GUI, a queue in the command line app).
+    """
+    def __init__(self, run_context, dispatch):
+        threading.Thread.__init__(self, name='svp_supervisor')
+        self.daemon = True
+        self.run_context = run_context
+        self.dispatch = dispatch
+        self.running = True
+        # set while the run context is not being serviced, the wait is skipped until the last dispatch has run
+        self.idle = threading.Event()
+        self.idle.set()
+        self.wake_conn, self.wake_send_conn = multiprocessing.Pipe(duplex=False)
+
+    def wakeup(self):
+        try:
+            self.wake_send_conn.send(None)
+        except Exception as e:
+            pass
+
+    def stop(self):
+        self.running = False
+        self.wakeup()
+
+    def run(self):
+        while self.running:
+            self.idle.wait()
+            if not self.running:
+                break
+            objects = [self.wake_conn]
+            for worker in list(self.run_context.workers):
+                if worker.app_conn is not None:
+                    objects.append(worker.app_conn)
+                if worker.process is not None:
+                    objects.append(worker.process.sentinel)
+            try:
+                ready = multiprocessing.connection.wait(objects, timeout=SUPERVISOR_TIMEOUT)
+            except (OSError, ValueError):
+                # a worker was closed while waiting, service the run context to pick up the change
+                ready = []
+            while self.wake_conn.poll():
+                self.wake_conn.recv()
+            if self.running:
+                self.idle.clear()
+                self.dispatch(self.service)
+        self.wake_conn.close()
+        self.wake_send_conn.close()
+
+    def service(self):
+        try:
+            if self.running:
+                self.run_context.periodic()
+        finally:
+            if not self.run_context.active:
+                self.running = False
+            self.idle.set()
+
 
 class RunContext(object):
 
@@ -614,14 +935,16 @@ class RunContext(object):
         self.results_name = results_name
         self.results_id = None
         self.results_file = None
+        self.journal = None
         self.lib_path = os.path.normpath(os.path.join(svp_dir, LIB_DIR))
         self.env = {}
 
         self.svp_file = svp_file
-        self.process = None
+        self.workers = []
+        self.worker_recycle = WORKER_RECYCLE_JOBS
+        self.supervisor = None
+        self.dispatch_queue = None
         self.log_file = None
-        self.test_conn = None
-        self.app_conn = None
         self.suites = []
         self.suite = None
         self.suite_params = None
@@ -629,14 +952,50 @@ class RunContext(object):
         self.result_dir = ''
         self.active_result = None
         self.status = None
+        # set by stop(), result updates from workers still running do not restart dispatch
+        self.stopped = False
 
     def is_alive(self):
-        if self.process is not None:
-            return self.process.is_alive()
+        for worker in self.workers:
+            if worker.is_busy() and worker.is_alive():
+                return True
         return False
 
+    def supervise(self, dispatch):
+        """ Service the run context from a supervisor thread instead of periodic polling.
+        """
+        if self.active and self.supervisor is None:
+            self.supervisor = RunSupervisor(self, dispatch)
+            self.supervisor.start()
+
+    def stop_supervisor(self):
+        if self.supervisor is not None:
+            self.supervisor.stop()
+            self.supervisor = None
+
+    def serve(self):
+        """ Service the run context on the calling thread until the run completes.
+        """
+        # the queue outlives an interrupted serve() so services already dispatched to it are not lost
+        if self.dispatch_queue is None:
+            self.dispatch_queue = queue.Queue()
+        self.supervise(self.dispatch_queue.put)
+        while self.active:
+            service = self.dispatch_queue.get()
+            service()
+
+    def busy_workers(self):
+        return [w for w in self.workers if w.is_busy()]
+
+    def worker_limit(self):
+        # members of the active suite may run concurrently up to the suite's worker limit
+        if self.suite is not None:
+            return max(self.suite.workers, 1)
+        return 1
+
     def run(self):
         self.active = True
+        self.stopped = False
         # set root result entry
         d = datetime.datetime.now()
         self.results_id = '%d-%02d-%02d_%02d-%02d-%02d-%03d' % (d.year, d.month, d.day, d.hour, d.minute, d.second,
@@ -651,6 +1010,7 @@ class RunContext(object):
         if self.results_tree:
             self.results = self.results_tree
             self.active_result = self.results
+            self.open_journal()
             self.update_result(name=self.results_id)
             self.active_result.results_index = 0
             self.svp_file = None
@@ -661,34 +1021,45 @@ class RunContext(object):
         else:
             self.results = rslt.Result(name=self.results_id, type=rslt.RESULT_TYPE_RESULT)
             self.active_result = self.results
+            self.open_journal()
             self.update_result()
 
         # start
         self.run_next()
 
     def run_next(self):
-        while self.suite:
-            self.active_result = self.suite.result
-            if self.results_tree:
-                self.svp_file = None
-                result = self.active_result.next_result()
-                if result is not None:
-                    self.active_result = result
-                    self.svp_file = result.file()
-            else:
-                self.svp_file = self.suite.next_member()
-            if self.svp_file is None:
-                self.suite = None if not self.suites else self.suites.pop()
-                if self.suite is not None:
-                    self.suite_params = self.suite.active_params
-                    self.suite_result_dir = self.suite.result_dir
+        while self.active and len(self.busy_workers()) < self.worker_limit():
+            while self.suite:
+                self.active_result = self.suite.result
+                if self.results_tree:
+                    self.svp_file = None
+                    result = self.active_result.next_result()
+                    if result is not None:
+                        self.active_result = result
+                        self.svp_file = result.file()
                 else:
-                    self.suite_params = None
-                    self.suite_result_dir = self.results_dir
-            else:
+                    self.svp_file = self.suite.next_member()
+                if self.svp_file is None:
+                    self.suite = None if not self.suites else self.suites.pop()
+                    if self.suite is not None:
+                        self.suite_params = self.suite.active_params
+                        self.suite_result_dir = self.suite.result_dir
+                    else:
+                        self.suite_params = None
+                        self.suite_result_dir = self.results_dir
+                else:
+                    break
+
+            if self.svp_file is None or self.stopped:
+                # wait for members still running in other workers before completing
+                if not self.busy_workers():
+                    self.active = False
+                    self.shutdown()
+                    self.close_journal()
+                    self.stop_supervisor()
+                    self.complete()
                 break
 
-        if self.svp_file is not None and self.status != rslt.RESULT_STOPPED:
             name, ext = os.path.splitext(self.svp_file)
             if ext == TEST_EXT:
                 filename = os.path.normpath(os.path.join(self.svp_dir, TESTS_DIR, self.svp_file))
@@ -701,7 +1072,7 @@ class RunContext(object):
                     self.update_result(status=rslt.RESULT_RUNNING, filename=log_file)
                 else:
                     result = rslt.Result(name=name, type=rslt.RESULT_TYPE_TEST, filename=log_file)
-                    self.active_result.add_result(result)
+                    self.append_result(self.active_result, result)
                     self.active_result = result
                     self.update_result(status=rslt.RESULT_RUNNING)
                 env = {'files_dir': self.files_dir,
@@ -727,10 +1098,9 @@ class RunContext(object):
                     suite.result = self.active_result
                 else:
                     suite.result = rslt.Result(name=name, type=rslt.RESULT_TYPE_SUITE)
-                    self.active_result.add_result(suite.result)
+                    self.append_result(self.active_result, suite.result)
                     self.active_result = suite.result
                     self.update_result()
-                self.run_next()
             elif ext == SCRIPT_EXT:
                 script_filename = os.path.normpath(os.path.join(self.svp_dir, SCRIPTS_DIR, self.svp_file))
                 self.result_dir = os.path.join(self.suite_result_dir, result_file_name(name))
@@ -740,7 +1110,7 @@ class RunContext(object):
                     self.update_result(status=rslt.RESULT_RUNNING, filename=log_file)
                 else:
                     result = rslt.Result(name=name, type=rslt.RESULT_TYPE_SCRIPT, filename=log_file)
-                    self.active_result.add_result(result)
+                    self.append_result(self.active_result, result)
                     self.active_result = result
                     self.update_result(status=rslt.RESULT_RUNNING)
                 env = {'files_dir': self.files_dir,
@@ -754,9 +1124,6 @@ class RunContext(object):
                 else:
                     raise SVPError('Target file missing extension')
             self.svp_file = None
-        else:
-            self.active = False
-            self.complete()
 
     def complete(self):
         pass
@@ -785,95 +1152,96 @@ class RunContext(object):
         '''
 
     def start(self, filename, env=None, config=None, params=None):
-        if self.process is not None:
+        if len(self.busy_workers()) >= self.worker_limit():
             raise SVPError('Execution context process already running')
 
-        try:
-            if self.test_conn is not None:
-                self.test_conn.close()
-                self.test_conn = None
-            if self.app_conn is not None:
-                self.app_conn.close()
-                self.app_conn = None
-        except Exception as e:
-            pass
-
-        try:
-            self.test_conn, self.app_conn = multiprocessing.Pipe()
-        except Exception as e:
-            print ('Error creating execution context pipe: {}'.format(e))
+        # reuse an idle warm worker if one is available
+        worker = None
+        for w in self.workers:
+            if not w.is_busy() and not w.is_spent() and w.is_alive():
+                worker = w
+                break
+        if worker is None:
+            slots = [w.slot for w in self.workers]
+            slot = 0
+            while slot in slots:
+                slot += 1
+            worker = RunWorker(lib_path=self.lib_path, recycle=self.worker_recycle, slot=slot)
+            worker.start()
+            if worker.process is None:
+                self.error(worker.error or 'Error creating execution context process')
+                worker.close()
+                self.update_result(status=script.RESULT_FAIL)
+                return
+            self.workers.append(worker)
 
         try:
-            if config is not None:
-                script_config = copy.deepcopy(config)
-            else:
-                script_config = None
-            self.process = MultiProcess(name='svp_process', target=process_run, args=(filename, env, script_config,
-                                                                                      params, self.lib_path,
-                                                                                      self.test_conn))
-            self.process.start()
+            worker.run(self.active_result, self.result_dir, filename, env, config=config, params=params)
         except Exception as e:
-            # raise
-            print ('Error creating execution context process: {}'.format(e))
-            try:
-                if self.process:
-                    self.process.terminate()
-                    # self.process.join(timeout=0)
-            except Exception as e:
-                pass
+            self.error('Error sending job to execution context process: {}'.format(e))
+            worker.terminate()
+            self.clean_up(worker)
 
-            self.process = None
+    def shutdown(self):
+        for worker in list(self.workers):
+            worker.shutdown()
+        self.workers = []
 
     def terminate(self):
-        if self.process and self.process.is_alive():
-            # ### send stop signal to process, stop forcefully for now
-            try:
-                self.process.terminate()
-            except Exception as e:
-                print ('Process termination error: {}'.format(e))
+        for worker in self.workers:
+            worker.terminate()
         self.status = script.RESULT_FAIL
-        self.clean_up()
+        for worker in list(self.workers):
+            self.clean_up(worker)
+        self.close_journal()
+        self.stop_supervisor()
 
     def stop(self):
+        self.stopped = True
         try:
-            if self.process and self.app_conn and self.status == rslt.RESULT_RUNNING:
-                self.update_result(status=rslt.RESULT_STOPPED)
-                self.app_conn.send({'op': RUN_MSG_CMD,
-                                    'cmd': RUN_MSG_CMD_STOP})
+            for worker in self.workers:
+                if worker.app_conn and worker.result is not None and worker.result.status == rslt.RESULT_RUNNING:
+                    self.active_result = worker.result
+                    self.update_result(status=rslt.RESULT_STOPPED)
+                    worker.app_conn.send({'op': RUN_MSG_CMD,
+                                          'cmd': RUN_MSG_CMD_STOP})
         except Exception as e:
             raise e
 
-    def clean_up(self):
-        try:
-            if self.test_conn is not None:
-                self.test_conn.close()
-                self.test_conn = None
-            if self.app_conn is not None:
-                self.app_conn.close()
-                self.app_conn = None
-        except Exception as e:
-            pass
-
-        try:
-            if self.process:
-                self.process.join(timeout=0)
-        except Exception as e:
-            pass
-
-        if self.process and self.process.exitcode != 0:
-            if self.status != rslt.RESULT_STOPPED:
-                self.update_result(status=script.RESULT_FAIL)
-
-        self.process = None
+    def job_done(self, worker, error=None):
+        if error is not None and worker.result is not None and worker.result.status != rslt.RESULT_STOPPED:
+            self.active_result = worker.result
+            self.update_result(status=script.RESULT_FAIL)
+        worker.job_done()
+        if worker.is_spent():
+            worker.shutdown()
+            if worker in self.workers:
+                self.workers.remove(worker)
+
+    def clean_up(self, worker):
+        # worker process exited or was terminated, a job still assigned to it did not complete
+        worker.close()
+
+        if worker.result is not None and worker.result.status != rslt.RESULT_STOPPED:
+            self.active_result = worker.result
+            self.update_result(status=script.RESULT_FAIL)
+        worker.job_done()
+
+        worker.process = None
+        if worker in self.workers:
+            self.workers.remove(worker)
 
     def periodic(self):
-        if self.app_conn:
-            count = 0
+        for worker in list(self.workers):
+            # route result updates from this worker to the result entry it is running
+            self.active_result = worker.result
+            self.result_dir = worker.result_dir
+            deadline = time.time() + PERIODIC_RECV_TIME
             msg = None
-            while count < PERIODIC_RECV_LIMIT:
-                if self.app_conn.poll() is True:
+            while worker.app_conn:
+                if worker.app_conn.poll() is True:
                     try:
-                        msg = self.app_conn.recv()
+                        msg = worker.app_conn.recv()
                         if isinstance(msg, dict):
                             op = msg.get('op')
                             if op == RUN_MSG_LOG:
@@ -881,19 +1249,21 @@ class RunContext(object):
                                 level = msg.get('level')
                                 message = msg.get('message')
                                 self.log(timestamp, level, message)
+                            elif op == RUN_MSG_LOG_BATCH:
+                                self.log_batch(msg.get('entries', []))
                             elif op == RUN_MSG_ALERT:
                                 message = msg.get('message')
                                 self.alert(message)
                             elif op == RUN_MSG_CONFIRM:
                                 message = msg.get('message')
                                 msg['result'] = self.confirm(message)
-                                self.app_conn.send(msg)
+                                self.ack(worker, msg)
                             elif op == RUN_MSG_RESULT:
                                 status = msg.get('status')
                                 filename = msg.get('filename')
                                 params = msg.get('params')
                                 self.update_result(status=status, filename=filename, params=params)
-                                self.app_conn.send(msg)
+                                self.ack(worker, msg)
                             elif op == RUN_MSG_RESULT_FILE:
                                 filename = None
                                 status = msg.get('status')
@@ -905,7 +1275,10 @@ class RunContext(object):
                                     result = rslt.Result(name=name, type=rslt.RESULT_TYPE_FILE, status=status,
                                                          filename=filename, params=params)
                                     self.add_result(result)
-                                self.app_conn.send(msg)
+                                self.ack(worker, msg)
+                            elif op == RUN_MSG_JOB_DONE:
+                                self.job_done(worker, msg.get('error'))
+                                break
                             elif op == RUN_MSG_STATUS:
                                 pass
                             elif op == RUN_MSG_CMD:
@@ -924,22 +1297,51 @@ class RunContext(object):
                                          level=script.ERROR)
                         self.log(entry.timestamp_str(), entry.level, entry.message)
 
-                    count += 1
+                    if time.time() >= deadline:
+                        break
                 else:
-                    if self.process and not self.process.is_alive():
-                        self.clean_up()
+                    if not worker.is_alive():
+                        self.clean_up(worker)
                     break
 
-        if self.active and self.process is None:
+        if self.active and len(self.busy_workers()) < self.worker_limit():
             self.run_next()
 
+    def open_journal(self):
+        self.journal = rslt.ResultJournal(self.results, self.results_file)
+        self.journal.open()
+
+    def close_journal(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+            self.update_catalog()
+
+    def update_catalog(self):
+        try:
+            catalog = rslt.ResultCatalog(os.path.join(self.svp_dir, rslt.RESULT_CATALOG),
+                                         os.path.join(self.svp_dir, RESULTS_DIR))
+            with catalog:
+                catalog.update(self.results_id, self.results)
+        except Exception as e:
+            self.error('Result catalog update error: {}'.format(e))
+
+    def append_result(self, parent, result):
+        parent.add_result(result)
+        if self.journal is not None:
+            self.journal.add(parent, result)
+        else:
+            self.results.to_xml_file(self.results_file)
+
+    def ack(self, worker, msg):
+        # echo the request back to the script unless it was sent without acknowledgement
+        if msg.get('ack', True) and worker.app_conn is not None:
+            worker.app_conn.send(msg)
+
     def add_result(self, result):
-        self.active_result.add_result(result)
-        self.results.to_xml_file(self.results_file)
+        self.append_result(self.active_result, result)
 
     def update_result(self, name=None, status=None, filename=None, params=None):
-        print ('update_result: name={}  status={}  filename={}  params={}'.format((name), (status), (filename),
-                                                                             (params)))
         self.status = status
         if self.active_result is not None:
             if name is not None:
@@ -950,8 +1352,11 @@ class RunContext(object):
                 self.active_result.filename = filename
             if params is not None:
                 self.active_result.params = params
-        print ('writing results: {}'.format(self.results_file))
-        self.results.to_xml_file(self.results_file)
+        if self.journal is not None:
+            if self.active_result is not None:
+                self.journal.update(self.active_result, name=name, status=status, filename=filename, params=params)
+        else:
+            self.results.to_xml_file(self.results_file)
 
     def alert(self, message):
         print ("{}".format(message))
@@ -960,8 +1365,142 @@ class RunContext(object):
         pass
 
     def log(self, timestamp, level, message):
-        print ('%s %s %s'.format(timestamp, level, message))
+        print ('{} {} {}'.format(timestamp, level, message))
+
+    def error(self, message):
+        # run context errors go to stderr, stdout may carry the run output
+        print (message, file=sys.stderr)
+
+    def log_batch(self, entries):
+        for timestamp, level, message in entries:
+            self.log(timestamp, level, message)
+
+
+# command line exit status
+EXIT_PASS = 0
+EXIT_FAIL = 1
+EXIT_USAGE = 2
+EXIT_INCOMPLETE = 3
+EXIT_ERROR = 4
+
+def results_exit_status(results):
+    """ Exit status for a result tree: fail if any test or script failed, incomplete if any was stopped or did not
+    finish, pass otherwise.
+    """
+    status = EXIT_PASS
+    if results.type in (rslt.RESULT_TYPE_TEST, rslt.RESULT_TYPE_SCRIPT):
+        if results.status == rslt.RESULT_FAIL:
+            return EXIT_FAIL
+        elif results.status not in (rslt.RESULT_PASS, rslt.RESULT_COMPLETE):
+            status = EXIT_INCOMPLETE
+    for r in results.results:
+        s = results_exit_status(r)
+        if s == EXIT_FAIL:
+            return EXIT_FAIL
+        elif s == EXIT_INCOMPLETE:
+            status = EXIT_INCOMPLETE
+    return status
+
+
+class JsonRunContext(RunContext):
+    """ Run context that reports progress as newline delimited JSON events, used by the command line runner.
+    """
+    def __init__(self, svp_dir, svp_file=None, results=None, results_name=None, assume_yes=False, out=None):
+        RunContext.__init__(self, svp_dir, svp_file=svp_file, results=results, results_name=results_name)
+        self.assume_yes = assume_yes
+        self.out = out
+        if self.out is None:
+            self.out = sys.stdout
+        self.result_paths = {}
+        self.exit_status = None
+
+    def emit(self, event, **fields):
+        fields['event'] = event
+        self.out.write(json.dumps(fields, default=str) + '\n')
+        self.out.flush()
+
+    def result_path(self, result):
+        # result names from below the root result to the result
+        if result is None or result is self.results:
+            return []
+        return self.result_paths.get(id(result), [result.name])
+
+    def append_result(self, parent, result):
+        RunContext.append_result(self, parent, result)
+        self.result_paths[id(result)] = self.result_path(parent) + [result.name]
+        if result.type == rslt.RESULT_TYPE_FILE:
+            self.emit('result_file', path=self.result_path(result), status=result.status,
+                      filename=result.filename)
+        else:
+            self.emit('start', path=self.result_path(result), type=result.type)
+
+    def update_result(self, name=None, status=None, filename=None, params=None):
+        RunContext.update_result(self, name=name, status=status, filename=filename, params=params)
+        if self.active_result is not None:
+            if name is not None and self.active_result is self.results:
+                self.emit('results', name=name, results_dir=self.results_dir)
+            if status is not None:
+                self.emit('status', path=self.result_path(self.active_result), type=self.active_result.type,
+                          status=status)
+            if params is not None:
+                self.emit('params', path=self.result_path(self.active_result), params=params)
+
+    def log(self, timestamp, level, message):
+        self.emit('log', path=self.result_path(self.active_result), timestamp=timestamp, level=level,
+                  message=message)
+
+    def alert(self, message):
+        self.emit('alert', path=self.result_path(self.active_result), message=message)
 
+    def error(self, message):
+        self.emit('error', path=self.result_path(self.active_result), message=message)
+
+    def confirm(self, message):
+        self.emit('confirm', path=self.result_path(self.active_result), message=message, result=self.assume_yes)
+        return self.assume_yes
+
+    def complete(self):
+        self.exit_status = results_exit_status(self.results)
+        self.emit('complete', results_dir=self.results_dir, results_file=self.results_file,
+                  exit_status=self.exit_status)
+
+
+def main(args=None):
+    """ Headless command line runner, runs an SVP suite, test or script without loading the GUI.
+    """
+    parser = argparse.ArgumentParser(prog='svp', description='Run an SVP suite, test or script and report progress '
+                                                             'as newline delimited JSON on stdout.',
+                                     epilog='exit status: 0 pass, 1 fail, 2 usage, 3 stopped or incomplete, 4 error')
+    parser.add_argument('svp_dir', help='SVP directory')
+    parser.add_argument('target', help='suite/test/script in SVP directory')
+    parser.add_argument('-n', '--results-name', help='name appended to the results directory')
+    parser.add_argument('-y', '--assume-yes', action='store_true', help='answer yes to script confirm requests')
+    args = parser.parse_args(args)
+
+    run_context = None
+    try:
+        run_context = JsonRunContext(args.svp_dir, args.target, results_name=args.results_name,
+                                     assume_yes=args.assume_yes)
+        run_context.run()
+        try:
+            run_context.serve()
+        except KeyboardInterrupt:
+            # stop running tests and wait for them to wind down, a second interrupt terminates them
+            try:
+                run_context.stop()
+                run_context.serve()
+            except KeyboardInterrupt:
+                run_context.terminate()
+                run_context.active = False
+    except Exception as e:
+        sys.stdout.write(json.dumps({'event': 'error', 'message': str(e)}) + '\n')
+        if run_context is not None:
+            run_context.terminate()
+        return EXIT_ERROR
+
+    if run_context.exit_status is None:
+        run_context.exit_status = results_exit_status(run_context.results)
+    return run_context.exit_status
 
 #########################################################################################################
 
@@ -1062,9 +1601,8 @@ class SVP(object):
 
         self.run_target(args.get('svp_dir'), args.get('svp_file'))
 
-        while self.run_context and self.run_context.active:
-            self.run_context.periodic()
-            time.sleep(.2)
+        if self.run_context is not None:
+            self.run_context.serve()
 
     def run_target(self, svp_dir, svp_file):
 
@@ -1195,8 +1733,6 @@ if __name__ == "__main__":
     # On Windows calling this function is necessary.
     multiprocessing.freeze_support()
 
-    app = SVP(1)
-    app.run({'svp_dir': 'c:/users/bob/pycharmprojects/svp test/',
-             'svp_file': 'suite_a.ste'})
+    sys.exit(main())
 
 
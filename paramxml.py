@@ -0,0 +1,276 @@
+"""
+
+Copyright 2018, SunSpec Alliance
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+"""
+
+"""
+Params XML codec shared by script configurations and suites.
+
+Params are encoded as a params element holding one param element per param, with the name and type of the value as
+attributes and the value as text. Indexed params carry index_start and index_count attributes and their values as
+space separated text, quoted where a value contains spaces.
+"""
+
+import shlex
+import array
+import xml.etree.ElementTree as ET
+import natsort
+
+PARAMS_TAG = 'params'
+PARAM_TAG = 'param'
+PARAM_ATTR_NAME = 'name'
+PARAM_ATTR_TYPE = 'type'
+PARAM_ATTR_INDEX_COUNT = 'index_count'
+PARAM_ATTR_INDEX_START = 'index_start'
+
+PARAM_TYPE_STR = 'string'
+PARAM_TYPE_INT = 'int'
+PARAM_TYPE_FLOAT = 'float'
+
+param_types = {'int': int, 'float': float, 'string': str,
+               int: 'int', float: 'float', str: 'string'}
+
+param_default = {int: 0, float: 0., str: ''}
+
+# array type codes for indexed param values
+indexed_typecodes = {int: 'q', float: 'd'}
+indexed_array_types = {'q': int, 'd': float}
+
+
+class ParamsXmlError(Exception):
+    pass
+
+def is_indexed(value):
+    return isinstance(value, (dict, IndexedValue))
+
+def indexed_array(values, vtype=None):
+    """ Values as a typed array when they are all of one numeric type, otherwise as a list.
+    """
+    values = list(values)
+    if vtype is None and values:
+        vtype = type(values[0])
+    typecode = indexed_typecodes.get(vtype)
+    if typecode is not None:
+        try:
+            if all(type(v) is vtype for v in values):
+                return array.array(typecode, values)
+        except (TypeError, OverflowError):
+            pass
+    return values
+
+class IndexedValue(object):
+    """ Indexed param value held in a typed array, or a list for values without an array type, accessed like the
+    dict encoding of an indexed param: by integer index and by the 'index_start' and 'index_count' keys.
+    """
+    __slots__ = ('index_count', 'index_start', '_values')
+
+    def __init__(self, index_count=0, index_start=0, values=None, vtype=None):
+        self.index_count = index_count
+        self.index_start = index_start
+        if values is None:
+            values = []
+        if not isinstance(values, array.array):
+            values = indexed_array(values, vtype)
+        self._values = values
+
+    def _pos(self, key):
+        if type(key) is not int:
+            raise KeyError(key)
+        return key - self.index_start
+
+    def __getitem__(self, key):
+        if key == 'index_count':
+            return self.index_count
+        if key == 'index_start':
+            return self.index_start
+        pos = self._pos(key)
+        if 0 <= pos < len(self._values):
+            return self._values[pos]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == 'index_count':
+            self.index_count = value
+            return
+        if key == 'index_start':
+            self.index_start = value
+            return
+        pos = self._pos(key)
+        if pos < 0:
+            raise KeyError(key)
+        if pos > len(self._values) or (isinstance(self._values, array.array) and
+                                       type(value) is not indexed_array_types[self._values.typecode]):
+            self._values = list(self._values)
+        if pos > len(self._values):
+            self._values.extend([None] * (pos - len(self._values)))
+        try:
+            if pos == len(self._values):
+                self._values.append(value)
+            else:
+                self._values[pos] = value
+        except OverflowError:
+            # out of range for the array type
+            self._values = list(self._values)
+            self[key] = value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return ['index_count', 'index_start'] + list(range(self.index_start, self.index_start + len(self._values)))
+
+    def values(self):
+        return [self[k] for k in self.keys()]
+
+    def items(self):
+        return [(k, self[k]) for k in self.keys()]
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return 2 + len(self._values)
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if is_indexed(other):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        if eq is NotImplemented:
+            return eq
+        return not eq
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+    def range_values(self, start, count):
+        # values for indexes start to start + count - 1, None where not set
+        pos = start - self.index_start
+        if pos == 0 and count <= len(self._values):
+            return self._values[:count]
+        return [self.get(i) for i in range(start, start + count)]
+
+def indexed_values_parse(text, vtype):
+    """ Values of an indexed param from its space separated config text. Values containing spaces are quoted.
+    """
+    if not text:
+        return []
+    if '"' in text or "'" in text or '\\' in text:
+        values = shlex.split(text)
+    else:
+        values = text.split()
+    typecode = indexed_typecodes.get(vtype)
+    if typecode is not None:
+        try:
+            return array.array(typecode, map(vtype, values))
+        except OverflowError:
+            pass
+    return list(map(vtype, values))
+
+def indexed_values_str(value, start, count):
+    """ Config text and param type of the values of an indexed param.
+    """
+    if isinstance(value, IndexedValue):
+        values = value.range_values(start, count)
+    else:
+        values = [value.get(i) for i in range(start, start + count)]
+    value_type = None
+    if isinstance(values, array.array):
+        value_type = param_types.get(indexed_array_types[values.typecode])
+        strs = map(str, values)
+    else:
+        strs = []
+        for v in values:
+            if value_type is None and v is not None:
+                value_type = param_types.get(type(v), PARAM_TYPE_STR)
+            v_str = str(v)
+            if ' ' in v_str:
+                v_str = '"%s"' % (v_str)
+            strs.append(v_str)
+    return ' '.join(strs), value_type
+
+def params_from_xml(params, element):
+    for e in element.findall('*'):
+        if e.tag == PARAMS_TAG:
+            for e_param in e.findall('*'):
+                if e_param.tag == PARAM_TAG:
+                    name = e_param.attrib.get(PARAM_ATTR_NAME)
+                    param_type = e_param.attrib.get(PARAM_ATTR_TYPE)
+                    count = e_param.attrib.get(PARAM_ATTR_INDEX_COUNT)
+                    start = e_param.attrib.get(PARAM_ATTR_INDEX_START)
+                    if name:
+                        vtype = param_types.get(param_type, str)
+                        if count is not None and start is not None:
+                            count = int(count)
+                            start = int(start)
+                            values = indexed_values_parse(e_param.text, vtype)
+                            value = IndexedValue(count, start, values)
+                            if len(values) != count:
+                                ### count/value mismatch
+                                pass
+                        else:
+                            value = vtype(e_param.text)
+                        params[name] = value
+
+def params_to_xml(params, parent=None):
+    if parent is not None:
+        e_params = ET.SubElement(parent, PARAMS_TAG)
+    else:
+        e_params = ET.Element(PARAMS_TAG)
+    sorted_params = natsort.natsorted(params)
+
+    for p in sorted_params:
+        value_type = None
+        value_str = None
+        attr = {PARAM_ATTR_NAME: p}
+        value = params.get(p)
+        if is_indexed(value):
+            start = value.get('index_start')
+            count = value.get('index_count')
+            attr[PARAM_ATTR_INDEX_START] = str(start)
+            attr[PARAM_ATTR_INDEX_COUNT] = str(count)
+            if count is not None and start is not None:
+                value_str, value_type = indexed_values_str(value, start, count)
+            else:
+                raise ParamsXmlError('Indexed param %s: count = %s start = %s' % (p, count, start))
+        else:
+            if value is not None:
+                value_type = param_types.get(type(value), PARAM_TYPE_STR)
+                value_str = str(value)
+
+        if value_type is not None:
+            attr[PARAM_ATTR_TYPE] = value_type
+
+        e_param = ET.SubElement(e_params, PARAM_TAG, attrib=attr)
+        if value_str is not None:
+            e_param.text = value_str
+
+    return e_params
@@ -20,10 +20,15 @@ limitations under the License.
 
 
 import os
+import sys
+import json
+import argparse
+import multiprocessing
 import xml.etree.ElementTree as ET
 import csv
 import math
-import xlsxwriter
+import time
+import sqlite3
 import natsort
 
 RESULT_TYPE_RESULT = 'result'
@@ -70,10 +75,251 @@ index_hdr = [('File', 30),
              ('Notes', 80)]
 
 XL_COL_WIDTH_DEFAULT = 10
+XL_MAX_ROWS = 1048576
+XL_SHEET_NAME_MAX = 31
+XL_SHEET_NAME_INVALID = '[]:*?/\\'
+# characters replaced in report file names made from result names
+REPORT_NAME_INVALID = '<>:"/\\|?*'
+# csv rows used to size worksheet columns, and rows converted per block when exporting
+CSV_SAMPLE_ROWS = 100
+CSV_BLOCK_ROWS = 4096
+# csv columns reported relative to their first value
+RELATIVE_VALUE_NAMES = ['TIME']
+
+# chart decimation, selected with the plot.decimate result param
+DECIMATE_MINMAX = 'minmax'
+DECIMATE_LTTB = 'lttb'
+DECIMATE_POINTS_DEFAULT = 2000
+
+RESULT_FILE_EXT = '.rlt'
+RESULT_JOURNAL_EXT = '.rlj'
+JOURNAL_OP_ADD = 'add'
+JOURNAL_OP_UPDATE = 'update'
+# journal events written before the result tree is compacted back into the results file
+JOURNAL_COMPACT_EVENTS = 500
+
+# index of the runs in a results directory, kept in the working directory
+RESULT_CATALOG = 'results_catalog.db'
+RESULT_CATALOG_TIMEOUT = 10
+
+def journal_filename(filename):
+    return os.path.splitext(filename)[0] + RESULT_JOURNAL_EXT
 
 def xl_col(index):
     return chr(index + 65)
 
+def csv_value(v):
+    try:
+        v = float(v)
+        if math.isnan(v) or math.isinf(v):
+            return ''
+    except ValueError:
+        pass
+    return v
+
+def csv_column(values):
+    # numeric columns become float arrays with nan for missing values, columns with text keep their values
+    import numpy
+    try:
+        return numpy.array(values, dtype=float)
+    except ValueError:
+        pass
+    values = [csv_value(v) for v in values]
+    for v in values:
+        if v != '' and not isinstance(v, float):
+            return numpy.array(values, dtype=object)
+    return numpy.array([numpy.nan if v == '' else v for v in values], dtype=float)
+
+
+class ResultData(object):
+    """ Result csv file contents as one NumPy array per column.
+    """
+    def __init__(self, names=None, columns=None):
+        self.names = names or []
+        self.columns = columns or []
+
+    def __len__(self):
+        if self.columns:
+            return len(self.columns[0])
+        return 0
+
+    def column(self, name):
+        return self.columns[self.names.index(name)]
+
+    def take(self, indices):
+        return ResultData(list(self.names), [c[indices] for c in self.columns])
+
+    def rows(self, start=0, end=None):
+        """ Rows as lists of python values with non finite values as empty strings.
+        """
+        import numpy
+        columns = []
+        for c in self.columns:
+            c = c[start:end]
+            values = c.tolist()
+            if c.dtype.kind == 'f':
+                finite = numpy.isfinite(c)
+                if not finite.all():
+                    values = [v if ok else '' for v, ok in zip(values, finite.tolist())]
+            columns.append(values)
+        return [list(row) for row in zip(*columns)]
+
+
+def decimate_minmax(x, y, points):
+    """ Indices of the minimum and maximum value in each of points/2 equal sized buckets.
+    """
+    import numpy
+    n = len(y)
+    buckets = max(points // 2, 1)
+    edges = numpy.linspace(0, n, buckets + 1).astype(int)
+    indices = [0, n - 1]
+    for i in range(buckets):
+        start, end = edges[i], edges[i + 1]
+        if end > start:
+            bucket = y[start:end]
+            if not numpy.isnan(bucket).all():
+                indices.append(start + int(numpy.nanargmin(bucket)))
+                indices.append(start + int(numpy.nanargmax(bucket)))
+    return numpy.unique(indices)
+
+def decimate_lttb(x, y, points):
+    """ Indices selected by largest-triangle-three-buckets downsampling.
+    """
+    import numpy
+    n = len(y)
+    if points >= n or points < 3:
+        return numpy.arange(n)
+    every = (n - 2) / float(points - 2)
+    indices = [0]
+    a = 0
+    for i in range(points - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = numpy.nanmean(x[end:next_end]) if next_end > end else x[n - 1]
+        avg_y = numpy.nanmean(y[end:next_end]) if next_end > end else y[n - 1]
+        area = numpy.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(numpy.nan_to_num(area, nan=-1.0).argmax())
+        indices.append(a)
+    indices.append(n - 1)
+    return numpy.unique(indices)
+
+decimate_methods = {DECIMATE_MINMAX: decimate_minmax,
+                    DECIMATE_LTTB: decimate_lttb}
+
+def decimate(data, x_name, y_names, method, points):
+    """ Row indices of data to keep when charting the y_names columns against x_name. Rows kept for any series
+    are kept for all so related columns, such as error bars, stay aligned.
+    """
+    import numpy
+    func = decimate_methods.get(method)
+    if func is None:
+        raise ResultError('Unknown decimation method: %s' % (method))
+    n = len(data)
+    x = None
+    if x_name in data.names:
+        x = data.column(x_name)
+    if x is None or x.dtype.kind != 'f':
+        x = numpy.arange(n, dtype=float)
+    indices = [numpy.array([0, n - 1])]
+    for name in y_names:
+        if name in data.names:
+            y = data.column(name)
+            if y.dtype.kind == 'f':
+                indices.append(func(x, y, points))
+    return numpy.unique(numpy.concatenate(indices))
+
+def csv_header(f):
+    # column names and any data line read while looking for them, the first line is data when it is all numeric
+    rec = f.readline()
+    names = [x.strip() for x in rec.split(',')]
+    try:
+        [float(x) for x in names]
+        return ['C%d' % (i + 1) for i in range(len(names))], [rec]
+    except ValueError:
+        return names, []
+
+def csv_data(names, lines):
+    """ Parse csv data lines into a ResultData. names is extended with generated names for ragged rows wider than
+    the header.
+    """
+    import numpy
+    columns = None
+    lines = [line for line in lines if line.strip()]
+    if lines:
+        try:
+            # fast path, all numeric with consistent row lengths
+            values = numpy.loadtxt(lines, delimiter=',', dtype=float, ndmin=2)
+            if values.shape[1] == len(names):
+                columns = [values[:, i].copy() for i in range(len(names))]
+        except ValueError:
+            pass
+        if columns is None:
+            rows = [[x.strip() for x in line.split(',')] for line in lines]
+            width = max([len(names)] + [len(row) for row in rows])
+            for i in range(len(names), width):
+                names.append('C%d' % (i + 1))
+            for row in rows:
+                if len(row) < width:
+                    row.extend([''] * (width - len(row)))
+            columns = [csv_column(list(col)) for col in zip(*rows)]
+    else:
+        columns = [numpy.array([], dtype=float) for name in names]
+    return ResultData(names, columns)
+
+def csv_relative(data, relative_value_names, start=None):
+    # offset relative value columns by their start values, taken from this data when not given
+    if start is None:
+        start = {}
+    for name in relative_value_names or []:
+        if name in data.names:
+            i = data.names.index(name)
+            c = data.columns[i]
+            if c.dtype.kind == 'f' and len(c) > 0:
+                if name not in start:
+                    start[name] = c[0]
+                data.columns[i] = c - start[name]
+    return start
+
+def load_csv(filename, relative_value_names=RELATIVE_VALUE_NAMES):
+    """ Load a whole result csv file into a ResultData. The first line is used as column names unless it is all
+    numeric. Columns named in relative_value_names are made relative to their first value.
+    """
+    f = open(filename)
+    try:
+        names, lines = csv_header(f)
+        lines.extend(f.readlines())
+    finally:
+        f.close()
+    data = csv_data(names, lines)
+    csv_relative(data, relative_value_names)
+    return data
+
+def load_csv_blocks(filename, relative_value_names=RELATIVE_VALUE_NAMES, block_rows=CSV_BLOCK_ROWS):
+    """ Generator of ResultData blocks of up to block_rows rows of a result csv file, parsed as load_csv() does so
+    only one block is held in memory. At least one block is produced, empty for a file with no data.
+    """
+    f = open(filename)
+    try:
+        names, lines = csv_header(f)
+        start = None
+        produced = False
+        for line in f:
+            lines.append(line)
+            if len(lines) >= block_rows:
+                data = csv_data(names, lines)
+                start = csv_relative(data, relative_value_names, start)
+                produced = True
+                yield data
+                lines = []
+        if lines or not produced:
+            data = csv_data(names, lines)
+            csv_relative(data, relative_value_names, start)
+            yield data
+    finally:
+        f.close()
+
+
 def find_result(results_dir, result_dir):
     r_target = None
     rlt_name = os.path.split(results_dir)[1]
@@ -81,10 +327,141 @@ def find_result(results_dir, result_dir):
     path = os.path.normpath(result_dir)
     path = path.split(os.sep)
     r = Result()
-    r.from_xml(filename=rlt_file)
-    r_target = r.find(path)
+    if os.path.isfile(journal_filename(rlt_file)):
+        # journal events address results by position in the whole tree
+        r.recover(filename=rlt_file)
+        r_target = r.find(path)
+    else:
+        r_target = r.load(rlt_file, path=path)
     return r_target
 
+REPORT_EXT = '.xlsx'
+REPORT_SUMMARY = 'summary.xlsx'
+
+summary_hdr = [('Results', 30),
+               ('Result', 30),
+               ('Workbook', 60),
+               ('Tests', 10),
+               ('Pass', 10),
+               ('Fail', 10),
+               ('Time (s)', 10),
+               ('Error', 80)]
+
+def result_counts(result):
+    # tests and scripts run, passed and failed under result
+    tests = passed = failed = 0
+    if result.type in (RESULT_TYPE_TEST, RESULT_TYPE_SCRIPT):
+        tests = 1
+        if result.status == RESULT_PASS:
+            passed = 1
+        elif result.status == RESULT_FAIL:
+            failed = 1
+    for r in result.results:
+        t, p, f = result_counts(r)
+        tests += t
+        passed += p
+        failed += f
+    return tests, passed, failed
+
+def report_filename(name, names):
+    # report file name for a result name, unique ignoring case among names, which it is added to
+    for c in REPORT_NAME_INVALID + os.sep:
+        name = name.replace(c, '_')
+    name = name.strip(' .') or '_'
+    filename = name
+    i = 1
+    while filename.lower() in names:
+        filename = '%s_%d' % (name, i)
+        i += 1
+    names.add(filename.lower())
+    return filename + REPORT_EXT
+
+def report_jobs(results_path, per_suite=False):
+    """ Workbooks to build for the results directories in results_path: one per results directory, or one per top
+    level suite, test or script when per_suite is True. Jobs are (results directory, result name, workbook file
+    name, position of the result in the top level results).
+    """
+    jobs = []
+    for name in sorted(os.listdir(results_path)):
+        results_dir = os.path.join(results_path, name)
+        rlt_file = os.path.join(results_dir, name + '.rlt')
+        if os.path.isfile(rlt_file):
+            if per_suite:
+                r = Result()
+                r.recover(filename=rlt_file)
+                names = set()
+                for i, child in enumerate(r.results):
+                    if child.type != RESULT_TYPE_FILE:
+                        filename = os.path.join(results_dir, report_filename(child.name, names))
+                        jobs.append((results_dir, child.name, filename, i))
+            else:
+                jobs.append((results_dir, None, os.path.join(results_dir, name + REPORT_EXT), None))
+    return jobs
+
+def report_workbook(job):
+    """ Build the workbook for a report job, run in a pool worker process.
+    """
+    results_dir, result_name, filename, result_index = job
+    start_time = time.time()
+    tests = passed = failed = 0
+    error = None
+    try:
+        rlt_name = os.path.split(results_dir)[1]
+        r = Result()
+        r.recover(filename=os.path.join(results_dir, rlt_name + '.rlt'))
+        if result_index is not None:
+            # by position, top level results may share a name
+            if result_index >= len(r.results) or r.results[result_index].name != result_name:
+                raise ResultError('Result %s not found' % (result_name))
+            r = r.results[result_index]
+        tests, passed, failed = result_counts(r)
+        r.to_xlsx(filename=filename, results_dir=results_dir)
+    except Exception as e:
+        error = str(e)
+    return (results_dir, result_name, filename, tests, passed, failed, time.time() - start_time, error)
+
+def results_report(results_path, workers=None, per_suite=False, summary=REPORT_SUMMARY):
+    """ Build workbooks for all the results in a results directory in a pool of worker processes and write a
+    summary index workbook linking to them. Returns the summary rows.
+    """
+    start_time = time.time()
+    jobs = report_jobs(results_path, per_suite=per_suite)
+    rows = []
+    if jobs:
+        pool = multiprocessing.Pool(processes=workers)
+        try:
+            for row in pool.imap_unordered(report_workbook, jobs):
+                rows.append(row)
+        finally:
+            pool.close()
+            pool.join()
+    rows.sort()
+
+    import xlsxwriter
+    wb = xlsxwriter.Workbook(os.path.join(results_path, summary), {'constant_memory': True})
+    try:
+        hdr_format = wb.add_format({'bold': True, 'align': 'center', 'valign': 'vcenter', 'text_wrap': True})
+        ws = wb.add_worksheet('Summary')
+        for i in range(len(summary_hdr)):
+            ws.set_column(i, i, summary_hdr[i][1])
+            ws.write(0, i, summary_hdr[i][0], hdr_format)
+        row_index = 1
+        for results_dir, result_name, filename, tests, passed, failed, elapsed, error in rows:
+            ws.write(row_index, 0, os.path.split(results_dir)[1])
+            ws.write(row_index, 1, result_name or '')
+            link = os.path.relpath(filename, results_path)
+            if error is None:
+                ws.write_url(row_index, 2, 'external:%s' % (link), string=link)
+            else:
+                ws.write(row_index, 2, link)
+            ws.write_row(row_index, 3, [tests, passed, failed, round(elapsed, 2), error or ''])
+            row_index += 1
+    finally:
+        wb.close()
+
+    print ('results_report: {} workbooks in {:.2f} s'.format(len(rows), time.time() - start_time))
+    return rows
+
 def result_workbook(file, results_dir, result_dir, index=True):
     r = find_result(results_dir, result_dir)
     if r is not None:
@@ -98,34 +475,88 @@ class ResultError(Exception):
     pass
 
 
+def shared_value(value):
+    # type, status and param name strings repeat across every node of a result tree, keep one copy of each
+    if value is not None:
+        return sys.intern(value)
+    return value
+
+
 class Result(object):
+    """ Node of a result tree. Whole results histories are held in memory so nodes have no instance dict, share
+    their type and status strings and only allocate a params dict when params are used.
+    """
+    __slots__ = ('_name', 'type', 'status', 'filename', '_params', 'result_path', 'ref', 'results_index', 'results',
+                 '_index', '_indexed', '_index_renames')
+
+    # renames of named results in any tree, child name indexes built before the last rename are rebuilt
+    renames = 0
 
     def __init__(self, name=None, type=None, status=None, filename=None, params=None, result_path=None):
-        self.name = name
-        self.type = type
-        self.status = status
+        self._name = name
+        self.type = shared_value(type)
+        self.status = shared_value(status)
         self.filename = filename
-        self.params = []
+        self._params = params
         self.result_path = result_path
         self.ref = None
         self.results_index = 0
-        if params is not None:
-            self.params = params
-        else:
-            self.params = {}
         self.results = []
+        self._index = None
+        self._indexed = 0
+        self._index_renames = 0
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, name):
+        if self._name is not None and name != self._name:
+            Result.renames += 1
+        self._name = name
+
+    @property
+    def params(self):
+        if self._params is None:
+            self._params = {}
+        return self._params
+
+    @params.setter
+    def params(self, params):
+        self._params = params
 
     def __str__(self):
         return self.to_str()
 
-    def find(self, path):
-        result = None
+    def child(self, name):
+        """ Last child result with name, looked up in a name index. Results appended to the results list since the
+        last lookup are added to the index first. The index is rebuilt after a result has been renamed or a child
+        removed with remove_result(). Callers that change the results list in other ways call reindex().
+        """
+        results = self.results
+        if self._index is None or self._indexed > len(results) or self._index_renames != Result.renames:
+            self.reindex()
+        elif self._indexed < len(results):
+            index = self._index
+            for r in results[self._indexed:]:
+                index[r.name] = r
+            self._indexed = len(results)
+        return self._index.get(name)
+
+    def reindex(self):
+        self._index = {}
         for r in self.results:
-            if r.name == path[0]:
-                if len(path) > 1:
-                    result = r.find(path[1:])
-                else:
-                    result = r
+            self._index[r.name] = r
+        self._indexed = len(self.results)
+        self._index_renames = Result.renames
+
+    def find(self, path):
+        result = self
+        for name in path:
+            result = result.child(name)
+            if result is None:
+                break
         return result
 
     def next_result(self):
@@ -136,13 +567,20 @@ class Result(object):
 
     def add_result(self, result):
         self.results.append(result)
+        if self._index is not None and self._indexed == len(self.results) - 1:
+            self._index[result.name] = result
+            self._indexed += 1
+
+    def remove_result(self, result):
+        self.results.remove(result)
+        self._index = None
 
     def file(self):
         return self.name + type_ext.get(self.type, '')
 
     def to_str(self, indent=''):
         s = '%sname = %s  type = %s  status = %s  filename = %s\n%s  params = %s\n%s  results = \n  ' % (
-            indent, self.name, self.type, self.status, self.filename, indent, self.params, indent
+            indent, self.name, self.type, self.status, self.filename, indent, self._params or {}, indent
         )
         indent += '  '
         for r in self.results:
@@ -151,18 +589,19 @@ class Result(object):
 
     def from_xml(self, element=None, filename=None):
         if element is None and filename is not None:
-            element = ET.ElementTree(file=filename).getroot()
-            self.result_path, file = os.path.split(filename)
+            self.load(filename)
+            return
         if element is None:
             raise ResultError('No xml document element')
         if element.tag != RESULT_TAG:
             raise ResultError('Unexpected result root element: %s' % (element.tag))
         self.name = element.attrib.get(RESULT_ATTR_NAME)
-        self.type = element.attrib.get(RESULT_ATTR_TYPE)
-        self.status = element.attrib.get(RESULT_ATTR_STATUS)
+        self.type = shared_value(element.attrib.get(RESULT_ATTR_TYPE))
+        self.status = shared_value(element.attrib.get(RESULT_ATTR_STATUS))
         self.filename = element.attrib.get(RESULT_ATTR_FILENAME)
-        self.params = {}
+        self._params = None
         self.results = []
+        self._index = None
         if self.name is None:
             raise ResultError('Result name missing')
 
@@ -174,7 +613,7 @@ class Result(object):
                         param_type = e_param.attrib.get(RESULT_PARAM_ATTR_TYPE)
                         if name:
                             vtype = param_types.get(param_type, str)
-                            self.params[name] = vtype(e_param.text)
+                            self.params[shared_value(name)] = vtype(e_param.text)
             elif e.tag == RESULT_RESULTS:
                 for e_param in e.findall('*'):
                     if e_param.tag == RESULT_TAG:
@@ -182,6 +621,80 @@ class Result(object):
                         self.results.append(result)
                         result.from_xml(e_param)
 
+    def load(self, filename, path=None):
+        """ Read the result tree from a results file, building each result as its element is parsed and discarding
+        parsed elements. If path, a list of result names below this result, is given, only the results along the
+        path and the subtrees of the results matching it are kept, and the result find(path) resolves to is
+        returned, or None if there is no match.
+        """
+        self.result_path, file = os.path.split(filename)
+        results = []
+        # per open result, whether it is kept in the tree: results on the path prefix, results matching the path
+        # and anything below those
+        kept = []
+        result_elements = []
+        elements = []
+        f = open(filename, 'rb')
+        try:
+            for event, e in ET.iterparse(f, events=('start', 'end')):
+                if event == 'start':
+                    if not elements:
+                        if e.tag != RESULT_TAG:
+                            raise ResultError('Unexpected result root element: %s' % (e.tag))
+                        result = self
+                    elif e.tag == RESULT_TAG and result_elements and elements[-1].tag == RESULT_RESULTS and \
+                            elements[-2] is result_elements[-1]:
+                        result = Result(result_path=self.result_path)
+                        level = len(results) - 1
+                        keep = path is None or level >= len(path)
+                        if not keep and kept[-1]:
+                            keep = e.attrib.get(RESULT_ATTR_NAME) == path[level]
+                        if keep and kept[-1]:
+                            results[-1].results.append(result)
+                        else:
+                            keep = False
+                        kept.append(keep)
+                    else:
+                        result = None
+                    if result is self:
+                        kept.append(True)
+                    if result is not None:
+                        result.name = e.attrib.get(RESULT_ATTR_NAME)
+                        result.type = shared_value(e.attrib.get(RESULT_ATTR_TYPE))
+                        result.status = shared_value(e.attrib.get(RESULT_ATTR_STATUS))
+                        result.filename = e.attrib.get(RESULT_ATTR_FILENAME)
+                        result._params = None
+                        result.results = []
+                        result._index = None
+                        if result.name is None:
+                            raise ResultError('Result name missing')
+                        results.append(result)
+                        result_elements.append(e)
+                    elements.append(e)
+                else:
+                    elements.pop()
+                    if e.tag == RESULT_PARAM and len(elements) > 1 and elements[-1].tag == RESULT_PARAMS and \
+                            elements[-2] is result_elements[-1] and kept[-1]:
+                        name = e.attrib.get(RESULT_PARAM_ATTR_NAME)
+                        param_type = e.attrib.get(RESULT_PARAM_ATTR_TYPE)
+                        if name:
+                            vtype = param_types.get(param_type, str)
+                            results[-1].params[shared_value(name)] = vtype(e.text)
+                    elif result_elements and e is result_elements[-1]:
+                        result_elements.pop()
+                        results.pop()
+                        kept.pop()
+                    # parsed elements are no longer needed, drop them from the document
+                    e.clear()
+                    if elements:
+                        del elements[-1][-1]
+        finally:
+            f.close()
+        if path is not None:
+            # a later result with the same name replaces an earlier one, as in find()
+            return self.find(path)
+        return self
+
     def to_xml(self, parent=None, filename=None):
         attr = {}
         if self.name:
@@ -199,12 +712,13 @@ class Result(object):
 
         e_params = ET.SubElement(e, RESULT_PARAMS)
 
-        params = natsort.natsorted(self.params, key=self.params.get)
+        result_params = self._params or {}
+        params = natsort.natsorted(result_params, key=result_params.get)
         for p in params:
             value_type = None
             value_str = None
             attr = {RESULT_PARAM_ATTR_NAME: p}
-            value = self.params.get(p)
+            value = result_params.get(p)
             if value is not None:
                 value_type = param_types.get(type(value), PARAM_TYPE_STR)
                 value_str = str(value)
@@ -244,6 +758,69 @@ class Result(object):
         else:
             print (xml)
 
+    def to_dict(self):
+        return {'name': self.name,
+                'type': self.type,
+                'status': self.status,
+                'filename': self.filename,
+                'params': self._params or {},
+                'results': [r.to_dict() for r in self.results]}
+
+    def from_dict(self, d):
+        self.name = d.get('name')
+        self.type = shared_value(d.get('type'))
+        self.status = shared_value(d.get('status'))
+        self.filename = d.get('filename')
+        self._params = d.get('params') or None
+        self.results = []
+        self._index = None
+        for rd in d.get('results', []):
+            result = Result(result_path=self.result_path)
+            result.from_dict(rd)
+            self.results.append(result)
+
+    def recover(self, filename):
+        """ Load the result tree from the results file and replay any journal events not yet compacted into it.
+        """
+        self.from_xml(filename=filename)
+        journal_file = journal_filename(filename)
+        if os.path.isfile(journal_file):
+            f = open(journal_file, 'r')
+            try:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        # partial last line from an interrupted write
+                        break
+                    self.replay(event)
+            finally:
+                f.close()
+
+    def replay(self, event):
+        result = self
+        for i in event.get('path', []):
+            if i >= len(result.results):
+                raise ResultError('Invalid result journal path: %s' % (event.get('path')))
+            result = result.results[i]
+        op = event.get('op')
+        if op == JOURNAL_OP_ADD:
+            index = event.get('index')
+            # events already compacted into the results file are skipped
+            if index == len(result.results):
+                child = Result(result_path=self.result_path)
+                child.from_dict(event.get('result', {}))
+                result.results.append(child)
+            elif index > len(result.results):
+                raise ResultError('Invalid result journal index: %s' % (index))
+        elif op == JOURNAL_OP_UPDATE:
+            for attr in ['name', 'status', 'filename', 'params']:
+                if attr in event:
+                    setattr(result, attr, event[attr])
+            result.status = shared_value(result.status)
+        else:
+            raise ResultError('Unknown result journal operation: %s' % (op))
+
     def to_xlsx(self, wb=None, filename=None, results_dir=None, index=True, index_row=0):
         print ('to_xlsx: {} {}'.format (wb, filename))
         result_wb = wb
@@ -256,7 +833,7 @@ class Result(object):
             name, ext = os.path.splitext(self.filename)
             if ext == '.csv':
                 index_row = result_wb.add_csv_file(os.path.join(results_dir, self.filename), self.name,
-                                                   relative_value_names = ['TIME'], params=self.params,
+                                                   relative_value_names = RELATIVE_VALUE_NAMES, params=self.params,
                                                    index_row=index_row)
         print ('results = {}'.format(self.results))
         for r in self.results:
@@ -269,11 +846,221 @@ class Result(object):
         return index_row
 
 
+class ResultJournal(object):
+    """ Append-only record of changes to a result tree, kept next to its results file.
+
+    Events are written as JSON lines and the full tree is only rewritten to the results file on compaction.
+    """
+    def __init__(self, results, filename, compact_events=JOURNAL_COMPACT_EVENTS):
+        self.results = results
+        self.filename = filename
+        self.journal_file = journal_filename(filename)
+        self.compact_events = compact_events
+        self.events = 0
+        self.paths = {}
+        self.f = None
+
+    def open(self):
+        self.compact()
+
+    def close(self):
+        self.compact()
+        if self.f is not None:
+            self.f.close()
+            self.f = None
+        try:
+            os.remove(self.journal_file)
+        except OSError:
+            pass
+
+    def path(self, result):
+        path = self.paths.get(id(result))
+        if path is None:
+            self.index(self.results, [])
+            path = self.paths.get(id(result))
+            if path is None:
+                raise ResultError('Result %s not in journaled result tree' % (result.name))
+        return path
+
+    def index(self, result, path):
+        self.paths[id(result)] = path
+        for i, r in enumerate(result.results):
+            self.index(r, path + [i])
+
+    def add(self, parent, result):
+        index = len(parent.results) - 1
+        path = self.path(parent)
+        self.index(result, path + [index])
+        self.write({'op': JOURNAL_OP_ADD, 'path': path, 'index': index, 'result': result.to_dict()})
+
+    def update(self, result, name=None, status=None, filename=None, params=None):
+        event = {'op': JOURNAL_OP_UPDATE, 'path': self.path(result)}
+        if name is not None:
+            event['name'] = name
+        if status is not None:
+            event['status'] = status
+        if filename is not None:
+            event['filename'] = filename
+        if params is not None:
+            event['params'] = params
+        self.write(event)
+
+    def write(self, event):
+        if self.f is None:
+            self.f = open(self.journal_file, 'a')
+        self.f.write(json.dumps(event, default=str) + '\n')
+        self.f.flush()
+        self.events += 1
+        if self.events >= self.compact_events:
+            self.compact()
+
+    def compact(self):
+        # replace the results file atomically, then drop the events it now contains
+        tmp_file = self.filename + '.tmp'
+        self.results.to_xml_file(tmp_file)
+        os.replace(tmp_file, self.filename)
+        if self.f is not None:
+            self.f.close()
+        self.f = open(self.journal_file, 'w')
+        self.events = 0
+
+
+def result_files(result, files=None):
+    if files is None:
+        files = []
+    if result.type == RESULT_TYPE_FILE and result.filename:
+        files.append(result.filename)
+    for r in result.results:
+        result_files(r, files)
+    return files
+
+
+class ResultCatalog(object):
+    """ SQLite index of the runs in a results directory so the runs can be listed without parsing every results
+    file. A run is re-indexed when its results or journal file changes.
+    """
+    def __init__(self, filename, results_path):
+        self.filename = filename
+        self.results_path = results_path
+        self.db = None
+
+    def open(self):
+        self.db = sqlite3.connect(self.filename, timeout=RESULT_CATALOG_TIMEOUT)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute('CREATE TABLE IF NOT EXISTS runs ('
+                        'name TEXT PRIMARY KEY, target TEXT, type TEXT, status TEXT, '
+                        'tests INTEGER, passed INTEGER, failed INTEGER, '
+                        'started REAL, updated REAL, signature TEXT, files TEXT)')
+        self.db.commit()
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def results_file(self, name):
+        return os.path.join(self.results_path, name, name + RESULT_FILE_EXT)
+
+    def signature(self, name):
+        """ Modification time and size of the results and journal files of a run, None if it has no results file.
+        """
+        sig = []
+        filename = self.results_file(name)
+        for f in (filename, journal_filename(filename)):
+            try:
+                st = os.stat(f)
+                sig.append('%s:%s' % (st.st_mtime, st.st_size))
+            except OSError:
+                if f == filename:
+                    return None
+                sig.append('')
+        return ','.join(sig)
+
+    def update(self, name, results=None):
+        """ Index run name, parsing its results file unless the result tree is supplied.
+        """
+        sig = self.signature(name)
+        if sig is None:
+            self.remove(name)
+            return
+        if results is None:
+            results = Result()
+            results.recover(filename=self.results_file(name))
+        tests, passed, failed = result_counts(results)
+        if failed:
+            status = RESULT_FAIL
+        elif os.path.isfile(journal_filename(self.results_file(name))):
+            # journal is removed when a run completes
+            status = RESULT_RUNNING
+        elif tests and tests == passed:
+            status = RESULT_PASS
+        else:
+            status = results.status
+        target = None
+        if results.results:
+            target = results.results[0].name
+        updated = os.path.getmtime(self.results_file(name))
+        try:
+            started = time.mktime(time.strptime(name[:19], '%Y-%m-%d_%H-%M-%S'))
+        except ValueError:
+            started = updated
+        self.db.execute('INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        (name, target, results.type, status, tests, passed, failed, started, updated, sig,
+                         json.dumps(result_files(results))))
+        self.db.commit()
+
+    def remove(self, name):
+        self.db.execute('DELETE FROM runs WHERE name = ?', (name,))
+        self.db.commit()
+
+    def runs(self):
+        runs = []
+        for row in self.db.execute('SELECT * FROM runs ORDER BY name DESC'):
+            run = dict(row)
+            run['files'] = json.loads(run['files'] or '[]')
+            runs.append(run)
+        return runs
+
+    def sync(self):
+        """ Bring the catalog up to date with the results directory and return its runs, newest first. Only runs
+        added or changed since the last sync are parsed.
+        """
+        signatures = {}
+        for row in self.db.execute('SELECT name, signature FROM runs'):
+            signatures[row['name']] = row['signature']
+        names = set()
+        if os.path.isdir(self.results_path):
+            for name in os.listdir(self.results_path):
+                sig = self.signature(name)
+                if sig is not None:
+                    names.add(name)
+                    if signatures.get(name) != sig:
+                        try:
+                            self.update(name)
+                        except Exception as e:
+                            print ('Result catalog error indexing {}: {}'.format(name, e))
+        for name in signatures:
+            if name not in names:
+                self.remove(name)
+        return self.runs()
+
+
 class ResultWorkbook(object):
 
-    def __init__(self, filename):
-        self.wb = xlsxwriter.Workbook(filename)
+    def __init__(self, filename, constant_memory=True):
+        # only loaded when a workbook is exported
+        import xlsxwriter
+        # constant memory mode streams each worksheet row to disk as it is written, rows must be written in order
+        self.wb = xlsxwriter.Workbook(filename, {'constant_memory': constant_memory})
         self.ws_index = None
+        self.sheet_names = set()
         self.hdr_format = self.wb.add_format()
         self.link_format = self.wb.add_format({'color': 'blue', 'underline': 1})
 
@@ -285,9 +1072,22 @@ class ResultWorkbook(object):
         self.link_format.set_align('center')
         self.link_format.set_align('vcenter')
 
+    def add_worksheet(self, title):
+        # worksheet names are limited in length and character set and must be unique ignoring case
+        for c in XL_SHEET_NAME_INVALID:
+            title = title.replace(c, '_')
+        name = title[:XL_SHEET_NAME_MAX]
+        i = 1
+        while name.lower() in self.sheet_names:
+            suffix = '_%d' % (i)
+            name = title[:XL_SHEET_NAME_MAX - len(suffix)] + suffix
+            i += 1
+        self.sheet_names.add(name.lower())
+        return self.wb.add_worksheet(name)
+
     def add_index(self):
         print ('add_index')
-        self.ws_index = self.wb.add_worksheet('Index')
+        self.ws_index = self.add_worksheet('Index')
         col = 0
         for i in range(len(index_hdr)):
             width = index_hdr[i][1]
@@ -307,7 +1107,34 @@ class ResultWorkbook(object):
         return index_row + 1
 
 
-    def add_chart(self, ws, params=None, index_row=None):
+    def add_decimated_sheet(self, ws, data, params, x_points, y_names):
+        """ Write a reduced copy of data to a hidden sheet for charting when decimation is requested in params and
+        the data has more rows than requested points. Returns the sheet and its row count or None.
+        """
+        method = params.get('plot.decimate')
+        if not method or data is None:
+            return None
+        try:
+            points = int(params.get('plot.decimate.points', DECIMATE_POINTS_DEFAULT))
+        except ValueError:
+            points = DECIMATE_POINTS_DEFAULT
+        if len(data) <= points:
+            return None
+        start_time = time.time()
+        x_name = x_points[0] if x_points else None
+        indices = decimate(data, x_name, y_names, method, points)
+        ws_dec = self.add_worksheet(ws.get_name() + '_chart')
+        ws_dec.hide()
+        ws_dec.write_row(0, 0, data.names)
+        line = 1
+        for row in data.take(indices).rows():
+            ws_dec.write_row(line, 0, row)
+            line += 1
+        print ('add_chart: {} decimated {} rows to {} in {:.2f} s'.format(method, len(data), len(indices),
+                                                                         time.time() - start_time))
+        return ws_dec, line
+
+    def add_chart(self, ws, params=None, index_row=None, data=None):
         print ('add chart')
         # get fieldnames in first row of worksheet
         colors = ['blue', 'green', 'purple', 'orange', 'red', 'brown', 'yellow']
@@ -330,9 +1157,9 @@ class ResultWorkbook(object):
 
         title = params.get('plot.title', '')
         # chartsheet = self.wb.add_chartsheet(title)
-        ws_chart = self.wb.add_worksheet(title)
+        ws_chart = self.add_worksheet(title)
         if index_row is not None:
-            index_row = self.add_index_entry(title, index_row)
+            index_row = self.add_index_entry(ws_chart.get_name(), index_row)
 
         chart = self.wb.add_chart({'type': 'scatter', 'subtype': 'straight'})
         # chartsheet.set_chart(chart)
@@ -351,6 +1178,18 @@ class ResultWorkbook(object):
 
         count = params.get('plot.point_value_count', 1)
         ws_name = ws.get_name()
+
+        # chart a decimated copy of the data, including error bar columns, when requested
+        y_names = list(y_points) + list(y2_points)
+        for name in y_points:
+            for error in ('min_error', 'max_error'):
+                error_name = params.get('plot.%s.%s' % (name, error))
+                if error_name:
+                    y_names.append(error_name)
+        decimated = self.add_decimated_sheet(ws, data, params, x_points, y_names)
+        if decimated is not None:
+            ws_dec, count = decimated
+            ws_name = ws_dec.get_name()
         categories = []
 
         if len(x_points) > 0:
@@ -442,91 +1281,64 @@ class ResultWorkbook(object):
 
     def add_csv_file(self, filename, title, relative_value_names=None, params=None, index_row=None):
         print ('add_csv_file: {}'.format (title))
-        col_width = []
-        line = 1
-        ws = self.wb.add_worksheet(title)
+        start_time = time.time()
+        ws = self.add_worksheet(title)
         if index_row is not None:
-            index_row = self.add_index_entry(title, index_row)
-        f = None
-        relative_value_index = []
-        relative_value_start = []
-        if relative_value_names is None:
-            relative_value_names = []
+            index_row = self.add_index_entry(ws.get_name(), index_row)
         if params is None:
             params = {}
         try:
-            f = open(filename)
-            '''
-            reader = csv.reader(f, skipinitialspace=True)
-            print 'reader = %s %s' % (filename, reader)
-            for row in reader:
-            '''
-            print ('filename = {} {}'.format (filename, f))
-            for rec in f:
-                row = [x.strip() for x in rec.split(',')]
-                # print 'row = %s' % (row)
+            # the worksheet is written a block at a time so memory does not grow with the file
+            blocks = load_csv_blocks(filename, relative_value_names=relative_value_names)
+            data = next(blocks)
+            for name in relative_value_names or []:
+                if name not in data.names:
+                    print ('Value error for relative value name: {}'.format (name))
+            params['plot.point_names'] = data.names
+
+            # column widths come from the header and a sample of the first rows so they can be set before any data
+            # is streamed out
+            col_width = [max(len(name) + 4, XL_COL_WIDTH_DEFAULT) for name in data.names]
+            for row in data.rows(0, CSV_SAMPLE_ROWS):
                 for i in range(len(row)):
-                    try:
-                        v = float(row[i])
-                        if math.isnan(v) or math.isinf(v):
-                            row[i] = ''
-                        else:
-                            row[i] = v
-                    except ValueError:
-                        pass
-                    # adjust column width if necessary
                     width = len(str(row[i])) + 4
-                    if width < XL_COL_WIDTH_DEFAULT:
-                        width = XL_COL_WIDTH_DEFAULT
-                    try:
-                        curr_width = col_width[i]
-                    except IndexError:
-                        curr_width = 0
-                    if width > curr_width:
-                        col_width.insert(i, width)
-                        ws.set_column(i, i, width)
-                # find fields to be treated as relative value
-                if line == 1:
-                    params['plot.point_names'] = row
-                    for i in range(len(row)):
-                        width = len(row[i]) + 4
-                        if width < XL_COL_WIDTH_DEFAULT:
-                            width = XL_COL_WIDTH_DEFAULT
-                        ws.set_column(i, i, width)
-                    if relative_value_names is not None:
-                        for name in relative_value_names:
-                            try:
-                                index = row.index(name)
-                                relative_value_index.append(index)
-                            except ValueError:
-                                print ('Value error for relative value name: {}'.format (name))
-                # get initial value for relative value fields
-                elif line == 2:
-                    for index in relative_value_index:
-                        relative_value_start.append(row[index])
-                        row[index] = 0
-                else:
-                    for index in relative_value_index:
-                        row[index] = row[index] - relative_value_start[index]
-                ws.write_row(line - 1, 0, row)
-                line += 1
-            params['plot.point_value_count'] = line - 1
-
-            if title[-4:] == '.csv':
-                chart_title = title[:-4]
-            else:
-                chart_title = title + '_chart'
+                    if width > col_width[i]:
+                        col_width[i] = width
+            for i in range(len(col_width)):
+                ws.set_column(i, i, col_width[i])
+
+            ws.write_row(0, 0, data.names)
+            line = 1
+            truncated = False
+            while data is not None and not truncated:
+                for row in data.rows():
+                    if line >= XL_MAX_ROWS:
+                        truncated = True
+                        break
+                    ws.write_row(line, 0, row)
+                    line += 1
+                if not truncated:
+                    data = next(blocks, None)
+            if truncated:
+                print ('add_csv_file: worksheet row limit reached, remaining rows not exported')
+                blocks.close()
+            params['plot.point_value_count'] = line
+
+            elapsed = time.time() - start_time
+            print ('add_csv_file: {} rows in {:.2f} s ({:.0f} rows/s)'.format(line - 1, elapsed,
+                                                                           (line - 1) / max(elapsed, 1e-6)))
 
             print ('params - plot: {} - {}'.format(params, params.get('plot.title')))
             if params is not None and params.get('plot.title') is not None:
-                index_row = self.add_chart(ws, params=params, index_row=index_row)
+                data = None
+                if params.get('plot.decimate'):
+                    # decimation works on whole columns, so only a decimated chart loads the whole file
+                    data = load_csv(filename, relative_value_names=relative_value_names)
+                index_row = self.add_chart(ws, params=params, index_row=index_row, data=data)
 
         except Exception as e:
             print ('add_csv_file error: {}'.format(e))
             raise
-        finally:
-            if f:
-                f.close()
 
         return index_row
 
@@ -555,6 +1367,22 @@ def xml_indent(elem, level=0):
         if level and (not elem.tail or not elem.tail.strip()):
             elem.tail = i
 
+def report_main(args=None):
+    parser = argparse.ArgumentParser(prog='result', description='Build result workbooks for a results directory.')
+    parser.add_argument('results_path', help='results directory')
+    parser.add_argument('-w', '--workers', type=int, help='worker processes (default: number of cpus)')
+    parser.add_argument('-s', '--per-suite', action='store_true', help='one workbook per top level suite or test')
+    args = parser.parse_args(args)
+    rows = results_report(args.results_path, workers=args.workers, per_suite=args.per_suite)
+    for row in rows:
+        if row[-1] is not None:
+            return 1
+    return 0
+
+if __name__ == "__main__" and len(sys.argv) > 1:
+    multiprocessing.freeze_support()
+    sys.exit(report_main())
+
 if __name__ == "__main__":
 
     result = Result(name='Result', type='suite')
@@ -37,6 +37,9 @@ is an integer index and the value is the value corresponding to the index. The d
 'index_start' and 'index_count' whose values are the integer values for the start index and number of
 parameter values, respectively.
 
+Indexed parameter values created by the script module are IndexedValue objects, which hold the values in an array
+and support the same access as the dict encoding. Either encoding is accepted where an indexed value is expected.
+
 
 '''
 
@@ -50,11 +53,11 @@ from builtins import range
 import sys
 import os
 import time
+import heapq
 import datetime
 import importlib
+import copy
 import xml.etree.ElementTree as ET
-import shlex
-import natsort
 
 import multiprocessing
 
@@ -67,6 +70,10 @@ try:
 except ImportError:
     import multiprocessing.forking as forking
 
+# params xml codec, names kept in this module for existing callers
+from paramxml import (PARAM_TYPE_STR, PARAM_TYPE_INT, PARAM_TYPE_FLOAT, param_types, param_default,
+                      IndexedValue, ParamsXmlError, is_indexed, params_from_xml, params_to_xml)
+
 
 version = '1.5.9'
 
@@ -81,15 +88,6 @@ RESULT_COMPLETE = 'Complete'
 RESULT_PASS = 'Pass'
 RESULT_FAIL = 'Fail'
 
-PARAM_TYPE_STR = 'string'
-PARAM_TYPE_INT = 'int'
-PARAM_TYPE_FLOAT = 'float'
-
-param_types = {'int': int, 'float': float, 'string': str,
-               int: 'int', float: 'float', str: 'string'}
-
-param_default = {int: 0, float: 0., str: ''}
-
 PTYPE_DIR = 'dir'
 PTYPE_FILE = 'file'
 
@@ -164,7 +162,43 @@ def xml_indent(elem, level=0):
         if level and (not elem.tail or not elem.tail.strip()):
             elem.tail = i
 
+# script info by script path, reused while the script and library files are unchanged
+script_info_cache = {}
+
+def script_info_cache_clear():
+    script_info_cache.clear()
+
+def file_signature(path):
+    try:
+        st = os.stat(path)
+        return (st.st_mtime, st.st_size)
+    except OSError:
+        return None
+
+def lib_signature(lib_path):
+    signature = []
+    if lib_path is not None and os.path.isdir(lib_path):
+        for root, dirs, files in os.walk(lib_path):
+            for f in files:
+                if f.endswith('.py'):
+                    filename = os.path.join(root, f)
+                    signature.append((filename, file_signature(filename)))
+    signature.sort()
+    return tuple(signature)
+
 def load_script(path, lib_path, path_list = None):
+    key = (os.path.normpath(path), lib_path, tuple(path_list or []))
+    signature = (file_signature(path), lib_signature(lib_path))
+    entry = script_info_cache.get(key)
+    if entry is not None and entry[0] == signature:
+        # each caller gets its own copy, param defs are resolved and extended by the callers
+        return Script(info=copy.deepcopy(entry[1]))
+
+    info = import_script_info(path, lib_path, path_list)
+    script_info_cache[key] = (signature, copy.deepcopy(info))
+    return Script(info=info)
+
+def import_script_info(path, lib_path, path_list = None):
     if path_list is not None:
         for p in path_list:
             sys.path.insert(0, p)
@@ -178,7 +212,6 @@ def load_script(path, lib_path, path_list = None):
         try:
             try:
                 info = m.script_info()
-                s = Script(info=info)
             except Exception as e:
                 raise e
                 # raise ScriptError('%s does not appear to be a script: %s' % (path, str(e)))
@@ -192,7 +225,7 @@ def load_script(path, lib_path, path_list = None):
     except Exception as e:
         raise e
         # raise ScriptError('Error importing module %s: %s' % (path, str(e)))
-    return s
+    return info
 
 def check_active_value(value, active_value):
     if is_sequence(value):
@@ -302,9 +335,10 @@ class Script(object):
         self.name = None
         self.desc = None
         self.param_defs = None
+        self.param_table = None
         self.info = info
         self.config = config
-        self.timers = []
+        self.timers = ScriptTimers()
         self.callback = False
         if params is None:
             self.params = {}
@@ -337,6 +371,8 @@ class Script(object):
             self.config = config
             self.log('Error loading script config file: %s' % str(e))
 
+        self.params_changed()
+
     def alert(self, message):
         print (message)
 
@@ -364,7 +400,10 @@ class Script(object):
         if params is None:
             params = {}
         if group is not None:
-            param_group = self.param_defs.param_group_get(group)
+            if self.param_table is not None:
+                param_group = self.param_table.param_group_get(group)
+            else:
+                param_group = self.param_defs.param_group_get(group)
         else:
             param_group = self.param_defs
         if param_group is not None:
@@ -417,10 +456,29 @@ class Script(object):
             if self.config is not None:
                 value = self.config.param_value(name, param_defs, param_value)
             if value is None:
-                if self.param_defs is not None:
+                if self.param_table is not None and param_defs is self.param_defs and param_value == self.param_value:
+                    param_def = self.param_table.param_def_get(name)
+                    if param_def is not None:
+                        value = param_def.value
+                elif self.param_defs is not None:
                     value = self.param_defs.param_value(name, param_defs, param_value)
         return value
 
+    def params_changed(self):
+        """ Rebuild the param lookup table. Needed after the config or param definitions change, changed param
+        values are picked up by the table itself.
+        """
+        self.param_table = None
+        if self.param_defs is not None:
+            self.param_table = ScriptParamTable(self.param_defs, self.param_value, self.param_raw_value)
+
+    def param_raw_value(self, name):
+        # value set in params or the config, without activity checks or definition defaults
+        value = self.params.get(name)
+        if value is None and self.config is not None:
+            value = self.config.param_value(name)
+        return value
+
     def result(self, status=None, params=None):
         s = 'Test result'
         if status is not None:
@@ -435,7 +493,7 @@ class Script(object):
     def results_dir(self):
         return self._results_dir
 
-    def result_file(self, name=None, status=None, params=None):
+    def result_file(self, name=None, status=None, params=None, ack=True):
         s = 'Test result file'
         if name is not None:
             s += ' - %s' % (name)
@@ -450,50 +508,74 @@ class Script(object):
 
     def resolve_active(self):
         if self.param_defs:
+            self.param_table = None
             self.param_defs.resolve_active(self.param_defs, self.param_value)
+            self.params_changed()
 
     def resolve_refs(self):
         if self.param_defs:
+            self.param_table = None
             self.param_defs.resolve_refs(self.param_defs, self.param_value)
+            self.params_changed()
 
     '''
-        Every entry is considered before any entry gets another chance
-        A complete pass thorough the timeout list is performed for any sleep call
+        Timers expired at the start of a pass are serviced in timeout order before any of them gets another chance
+        Waiting is done until the earlier of the wake time and the next timer timeout
         sleep() can not be called in a timer callback routine
     '''
     def sleep(self, seconds):
         if self.callback is True:
             raise ScriptError('Can not call sleep() from callback function')
-        current_time = time.time()
-        wake_time = current_time + seconds
-        sleep_time = wake_time - current_time
-        while sleep_time > 0:
-            timers = self.timers[:]
-            for t in timers:
-                next = t.next_timeout - current_time
-                if next <= 0:
-                    self.callback = True
-                    t.callback(t.arg)
-                    self.callback = False
-                    if t.repeating is False:
-                        self.timer_cancel(t)
-                    else:
-                        t.next_timeout += t.period
-                        next = t.next_timeout - current_time
-                if next < sleep_time:
-                    sleep_time = next
-            time.sleep(sleep_time)
-            current_time = time.time()
+        wake_time = time.monotonic() + seconds
+        while True:
+            next_timeout = self.timers_service()
+            current_time = time.monotonic()
             sleep_time = wake_time - current_time
+            if sleep_time <= 0:
+                break
+            if next_timeout is not None and next_timeout - current_time < sleep_time:
+                sleep_time = next_timeout - current_time
+            if sleep_time > 0:
+                self.sleep_wait(sleep_time)
+
+    def sleep_wait(self, timeout):
+        time.sleep(timeout)
+
+    def timers_service(self):
+        """ Run the callbacks of expired timers. Returns the monotonic time of the next timeout, None if there are
+        no timers. An exception from a callback is raised after its timer is rescheduled and the expired timers
+        not yet run are put back, so all of them stay scheduled.
+        """
+        timers = self.timers.expired(time.monotonic())
+        for i, t in enumerate(timers):
+            # an earlier callback in this pass may have cancelled the timer
+            if not t.active:
+                continue
+            t.fire(time.monotonic())
+            self.callback = True
+            try:
+                t.callback(t.arg)
+            except BaseException:
+                for pending in timers[i + 1:]:
+                    if pending.active:
+                        self.timers.push(pending)
+                raise
+            finally:
+                self.callback = False
+                self.timers.reschedule(t)
+        return self.timers.next_timeout()
 
     def timer_cancel(self, timer):
-        self.timers.remove(timer)
+        self.timers.cancel(timer)
 
     def timer_start(self, period, callback, arg=None, repeating=False):
         timer = ScriptTimer(period, callback, arg=arg, repeating=repeating)
-        self.timers.append(timer)
+        self.timers.add(timer)
         return timer
 
+    def timer_stats(self):
+        return [t.stats() for t in self.timers]
+
     def svp_version(self, required=None):
         if required is not None:
             required_version = required.split('.')
@@ -509,13 +591,117 @@ class Script(object):
 
 
 class ScriptTimer(object):
+    """ Timeouts are on the monotonic clock. A repeating timer times out at start + count * period so callback
+    latency does not accumulate; periods already over when the timer is rescheduled are skipped and counted as missed.
+    """
     def __init__(self, period, callback, arg, repeating=False):
         self.period = period
         self.callback = callback
         self.arg = arg
         self.repeating = repeating
         self.count = 1
-        self.next_timeout = time.time() + period
+        self.start_time = time.monotonic()
+        self.next_timeout = self.start_time + period
+        self.active = False
+        self.seq = None
+        self.fired = 0
+        self.missed = 0
+        self.jitter_last = 0.
+        self.jitter_max = 0.
+        self.jitter_total = 0.
+
+    def fire(self, current_time):
+        jitter = current_time - self.next_timeout
+        self.fired += 1
+        self.jitter_last = jitter
+        self.jitter_total += jitter
+        if jitter > self.jitter_max:
+            self.jitter_max = jitter
+
+    def advance(self, current_time):
+        self.count += 1
+        self.next_timeout = self.start_time + self.count * self.period
+        if self.next_timeout <= current_time and self.period > 0:
+            missed = int((current_time - self.next_timeout) / self.period) + 1
+            self.missed += missed
+            self.count += missed
+            self.next_timeout = self.start_time + self.count * self.period
+
+    def jitter_mean(self):
+        if self.fired:
+            return self.jitter_total / self.fired
+        return 0.
+
+    def stats(self):
+        return {'period': self.period,
+                'fired': self.fired,
+                'missed': self.missed,
+                'jitter_last': self.jitter_last,
+                'jitter_mean': self.jitter_mean(),
+                'jitter_max': self.jitter_max}
+
+
+class ScriptTimers(object):
+    """ Active timers in a heap ordered by next timeout. A cancelled timer is marked inactive and its heap entry is
+    dropped when it reaches the top, so start and cancel are O(log n).
+    """
+    def __init__(self):
+        self.heap = []
+        self.seq = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return iter([entry[2] for entry in sorted(self.heap) if self.current(entry)])
+
+    @staticmethod
+    def current(entry):
+        # entries left behind by a cancel, or by a cancel and restart of the same timer, are stale
+        return entry[2].active and entry[2].seq == entry[1]
+
+    def push(self, timer):
+        # sequence number keeps timers with the same timeout in start order and never compares timers
+        self.seq += 1
+        timer.seq = self.seq
+        heapq.heappush(self.heap, (timer.next_timeout, self.seq, timer))
+
+    def add(self, timer):
+        if not timer.active:
+            timer.active = True
+            self.count += 1
+        self.push(timer)
+
+    def cancel(self, timer):
+        if timer.active:
+            timer.active = False
+            self.count -= 1
+
+    def next_timeout(self):
+        while self.heap and not self.current(self.heap[0]):
+            heapq.heappop(self.heap)
+        if self.heap:
+            return self.heap[0][0]
+
+    def expired(self, current_time):
+        """ Remove and return the active timers timed out at current_time, in timeout order. """
+        timers = []
+        while self.heap and self.heap[0][0] <= current_time:
+            entry = heapq.heappop(self.heap)
+            if self.current(entry):
+                entry[2].seq = None
+                timers.append(entry[2])
+        return timers
+
+    def reschedule(self, timer):
+        # an expired timer goes back in the heap only if it repeats and was not cancelled by its callback
+        if timer.active:
+            if timer.repeating is False:
+                self.cancel(timer)
+            else:
+                timer.advance(time.monotonic())
+                self.push(timer)
 
 
 class ScriptParamDef(object):
@@ -552,24 +738,7 @@ class ScriptParamDef(object):
             if self.index_start is None:
                 self.index_start = 0
             if type(self.index_count) != str and type(self.index_start) != str:
-                self.value = {'index_count': self.index_count, 'index_start': self.index_start}
-                for i in range(self.index_start, self.index_start + self.index_count):
-                    if type(self.default) == dict:
-                        value = self.default.get(i)
-                        if value is not None:
-                            if self.vtype is None:
-                                self.vtype = type(value)
-                            else:
-                                if self.vtype != type(value):
-                                    ### error - multiple value types in parameter
-                                    pass
-                        else:
-                            value = param_default.get(self.vtype)
-                        self.value[i] = value
-                    else:
-                        self.value[i] = self.default
-                        if self.vtype is None:
-                            self.vtype = type(self.default)
+                self.index_update(self.index_count, self.index_start)
             else:
                 self.value = {}
         else:
@@ -587,9 +756,9 @@ class ScriptParamDef(object):
         return active_entry
 
     def index_update(self, index_count, index_start):
-        self.value = {'index_count': index_count, 'index_start': index_start}
-        for i in range(index_start, index_start + index_count):
-            if type(self.default) == dict:
+        if is_indexed(self.default):
+            values = []
+            for i in range(index_start, index_start + index_count):
                 value = self.default.get(i)
                 if value is not None:
                     if self.vtype is None:
@@ -600,11 +769,12 @@ class ScriptParamDef(object):
                             pass
                 else:
                     value = param_default.get(self.vtype)
-                self.value[i] = value
-            else:
-                self.value[i] = self.default
-                if self.vtype is None:
-                    self.vtype = type(self.default)
+                values.append(value)
+        else:
+            if self.vtype is None:
+                self.vtype = type(self.default)
+            values = [self.default] * index_count
+        self.value = IndexedValue(index_count, index_start, values)
 
     def dump(self, indent=''):
         return '%sparam - name: %s  label: %s  default: %s  active: %s  active_value: %s  desc: %s  values: %s  referenced: %s  ptype: %s  width: %s' %  (indent,
@@ -829,77 +999,201 @@ class ScriptParamGroupDef(object):
             s += '%s\n' % param.dump(indent)
         return s
 
-def params_from_xml(params, element):
-    for e in element.findall('*'):
-        if e.tag == SCRIPT_CFG_PARAMS:
-            for e_param in e.findall('*'):
-                if e_param.tag == SCRIPT_PARAM:
-                    name = e_param.attrib.get(SCRIPT_PARAM_ATTR_NAME)
-                    param_type = e_param.attrib.get(SCRIPT_PARAM_ATTR_TYPE)
-                    count = e_param.attrib.get(SCRIPT_PARAM_INDEX_COUNT)
-                    start = e_param.attrib.get(SCRIPT_PARAM_INDEX_START)
-                    if name:
-                        vtype = param_types.get(param_type, str)
-                        if count is not None and start is not None:
-                            count = int(count)
-                            start = int(start)
-                            value = {'index_count': count, 'index_start': start}
-                            values = shlex.split(e_param.text)
-                            i = start
-                            for v in values:
-                                value[i] = vtype(v)
-                                i += 1
-                            if len(values) != count:
-                                ### count/value mismatch
-                                pass
-                        else:
-                            value = vtype(e_param.text)
-                        params[name] = value
-
-def params_to_xml(params, parent=None):
-    if parent is not None:
-        e_params = ET.SubElement(parent, SCRIPT_CFG_PARAMS)
-    else:
-        e_params = ET.Element(SCRIPT_CFG_PARAMS)
-    sorted_params = natsort.natsorted(params, key=params.get)
-
-    for p in sorted_params:
-        value_type = None
-        value_str = None
-        attr = {SCRIPT_PARAM_ATTR_NAME: p}
-        value = params.get(p)
-        if type(value) == dict:
-            start = value.get('index_start')
-            count = value.get('index_count')
-            attr['index_start'] = str(start)
-            attr['index_count'] = str(count)
-            if count is not None and start is not None:
-                value_str = ''
-                value_type = None
-                for i in range(start, start + count):
-                    v = value.get(i)
-                    if value_type is None and v is not None:
-                        value_type = param_types.get(type(v), PARAM_TYPE_STR)
-                    v_str = str(v)
-                    if ' ' in v_str:
-                        v_str = '"%s"' % (v_str)
-                    value_str += '%s ' % (v_str)
-            else:
-                ### error unknown dict value type
-                pass
-        else:
-            if value is not None:
-                value_type = param_types.get(type(value), PARAM_TYPE_STR)
-                value_str = str(value)
+class ScriptParamTable(object):
+    """ Qualified name index of a param definition tree. Params whose definition and groups have no active
+    references are always active and are served straight from the index. For other names the active definition
+    found through param_value is cached along with the values, read through raw_value, of the params its activity
+    depends on, and is looked up again when any of those values has changed.
+    """
+    def __init__(self, param_defs, param_value, raw_value):
+        self.param_defs = param_defs
+        self.param_value = param_value
+        self.raw_value = raw_value
+        self.qnames = {}
+        self.refs = {}
+        self.active = {}
+        self.add(param_defs)
+
+    def add(self, group):
+        # only index names that the tree walk resolves to the same definition
+        for g in group.param_groups:
+            if self.param_defs.param_group_get(g.qname) is g:
+                self.qnames[g.qname] = g
+            self.add(g)
+        for p in group.params:
+            if self.param_defs.param_def_get(p.qname, self.param_defs, active=False) is p:
+                self.qnames[p.qname] = p
+
+    def name_refs(self, name, visiting=None):
+        """ Sorted names of the params the activity of name depends on: the active references of its groups and
+        definition, alternate entries included, and their own dependencies. None if the walk for name can not be
+        followed in the index or the references are circular, such names are not cached.
+        """
+        try:
+            return self.refs[name]
+        except KeyError:
+            pass
+        if visiting is None:
+            visiting = set()
+        if name in visiting:
+            return None
+        visiting.add(name)
+        refs = set()
+        path = name.split(PARAM_SEP)
+        for i in range(len(path)):
+            entry = self.qnames.get(PARAM_SEP.join(path[:i + 1]))
+            if entry is None:
+                if i < len(path) - 1:
+                    refs = None
+                break
+            for e in [entry] + entry.entries:
+                if e.active is not None:
+                    ref_refs = self.name_refs(e.active, visiting)
+                    if ref_refs is None:
+                        refs = None
+                        break
+                    refs.add(e.active)
+                    refs.update(ref_refs)
+            if refs is None:
+                break
+        visiting.discard(name)
+        if refs is not None:
+            refs = tuple(sorted(refs))
+        self.refs[name] = refs
+        return refs
+
+    def invalidate(self):
+        self.active = {}
 
-        if value_type is not None:
-            attr[SCRIPT_PARAM_ATTR_TYPE] = value_type
+    def param_group_get(self, name):
+        entry = self.qnames.get(name)
+        if isinstance(entry, ScriptParamGroupDef):
+            return entry
+        return self.param_defs.param_group_get(name)
+
+    def param_def_get(self, name):
+        refs = self.name_refs(name)
+        if refs is None:
+            return self.param_defs.param_def_get(name, self.param_defs, self.param_value)
+        if not refs:
+            entry = self.qnames.get(name)
+            if entry is not None and not isinstance(entry, ScriptParamGroupDef):
+                return entry
+        values = [self.raw_value(ref) for ref in refs]
+        cached = self.active.get(name)
+        if cached is not None and cached[1] == values:
+            return cached[0]
+        param_def = self.param_defs.param_def_get(name, self.param_defs, self.param_value)
+        self.active[name] = (param_def, values)
+        return param_def
 
-        e_param = ET.SubElement(e_params, SCRIPT_PARAM, attrib=attr)
-        if value_str is not None:
-            e_param.text = value_str
+class ScriptParamGraph(object):
+    """ Dependency graph of the param definitions in a param definition tree. An entry depends on its parent group
+    and on the params named by its active, index_count and index_start references. evaluate() computes the state,
+    activity and index range, of every entry in dependency order and update() recomputes only the entries downstream
+    of a changed param.
+
+    raw_value(name) returns a param value as edited or configured, None if it is not set, without any activity
+    checks. Referenced values are gated by the states already computed, so no entry is resolved more than once.
+    """
+    def __init__(self, param_defs):
+        self.param_defs = param_defs
+        self.entries = {}
+        self.dependents = {}
+        self.order = []
+        self.states = {}
+        self.add(param_defs)
+        self.sort()
+
+    def add(self, entry):
+        self.entries[entry.qname] = entry
+        for g in entry.param_groups:
+            self.add(g)
+        for p in entry.params:
+            self.entries[p.qname] = p
+
+    def depends(self, entry):
+        deps = []
+        if entry.parent is not None:
+            deps.append(entry.parent.qname)
+        for ref in (entry.active, entry.index_count, entry.index_start):
+            if type(ref) == str and ref in self.entries:
+                deps.append(ref)
+        return deps
+
+    def sort(self):
+        pending = {}
+        for qname, entry in self.entries.items():
+            deps = self.depends(entry)
+            pending[qname] = len(deps)
+            for d in deps:
+                self.dependents.setdefault(d, []).append(qname)
+        ready = [qname for qname, count in pending.items() if count == 0]
+        while ready:
+            qname = ready.pop()
+            self.order.append(qname)
+            for d in self.dependents.get(qname, []):
+                pending[d] -= 1
+                if pending[d] == 0:
+                    ready.append(d)
+        if len(self.order) != len(self.entries):
+            cycle = sorted(qname for qname, count in pending.items() if count > 0)
+            raise ScriptParamError('Circular parameter reference: %s' % (', '.join(cycle)))
+
+    def value(self, name, raw_value):
+        # value of an active param, its definition default when it is not set
+        if not self.is_active(name):
+            return None
+        value = raw_value(name)
+        if value is None:
+            value = getattr(self.entries.get(name), 'value', None)
+        return value
 
-    return e_params
+    def state(self, entry, raw_value):
+        active = True
+        if entry.parent is not None and not self.states[entry.parent.qname][0]:
+            active = False
+        elif entry.active is not None:
+            if not self.is_active(entry.active):
+                active = False
+            elif check_active_value(self.value(entry.active, raw_value), entry.active_value) is None:
+                active = False
+        index_count = entry.index_count
+        index_start = entry.index_start
+        if active:
+            if type(index_count) == str:
+                index_count = self.value(index_count, raw_value)
+            if type(index_start) == str:
+                index_start = self.value(index_start, raw_value)
+        return active, index_count, index_start
+
+    def evaluate(self, raw_value):
+        self.states = {}
+        for qname in self.order:
+            self.states[qname] = self.state(self.entries[qname], raw_value)
+
+    def update(self, name, raw_value):
+        """ Recompute the entries downstream of param name after its value changed and return the names of those
+        whose state changed.
+        """
+        downstream = set()
+        stack = [name]
+        while stack:
+            for d in self.dependents.get(stack.pop(), []):
+                if d not in downstream:
+                    downstream.add(d)
+                    stack.append(d)
+        changed = []
+        for qname in self.order:
+            if qname in downstream:
+                state = self.state(self.entries[qname], raw_value)
+                if state != self.states.get(qname):
+                    self.states[qname] = state
+                    changed.append(qname)
+        return changed
+
+    def is_active(self, name):
+        return self.states.get(name, (False,))[0]
 
 # script config xml elements and attributes
 SCRIPT_CFG = 'scriptConfig'
@@ -964,48 +1258,10 @@ class ScriptConfig(object):
         params_from_xml(self.params, element)
 
     def params_to_xml(self, parent=None):
-        if parent is not None:
-            e_params = ET.SubElement(parent, SCRIPT_CFG_PARAMS)
-        else:
-            e_params = ET.Element(SCRIPT_CFG_PARAMS)
-        params = natsort.natsorted(self.params, key= self.params.get)
-
-        for p in params:
-            value_type = None
-            value_str = None
-            attr = {SCRIPT_PARAM_ATTR_NAME: p}
-            value = self.params.get(p)
-            if type(value) == dict:
-                start = value.get('index_start')
-                count = value.get('index_count')
-                attr['index_start'] = str(start)
-                attr['index_count'] = str(count)
-                if count is not None and start is not None:
-                    value_str = ''
-                    value_type = None
-                    for i in range(start, start + count):
-                        v = value.get(i)
-                        if value_type is None and v is not None:
-                            value_type = param_types.get(type(v), PARAM_TYPE_STR)
-                        v_str = str(v)
-                        if ' ' in v_str:
-                            v_str = '"%s"' % (v_str)
-                        value_str += '%s ' % (v_str)
-                else:
-                    raise ScriptConfigError('Script configuration error: count = %s start = %s' % (count, start))
-            else:
-                if value is not None:
-                    value_type = param_types.get(type(value), PARAM_TYPE_STR)
-                    value_str = str(value)
-
-            if value_type is not None:
-                attr[SCRIPT_PARAM_ATTR_TYPE] = value_type
-
-            e_param = ET.SubElement(e_params, SCRIPT_PARAM, attrib=attr)
-            if value_str is not None:
-                e_param.text = value_str
-
-        return e_params
+        try:
+            return params_to_xml(self.params, parent)
+        except ParamsXmlError as e:
+            raise ScriptConfigError('Script configuration error: %s' % (str(e)))
 
     def to_xml(self, parent=None, filename=None):
         attr = {}
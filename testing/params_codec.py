@@ -0,0 +1,132 @@
+"""
+Round trip and throughput of the params xml codec over a corpus of generated test configurations, compared with the
+previous per element codec.
+
+    python testing/params_codec.py [configs] [points]
+"""
+
+import os
+import sys
+import shlex
+import shutil
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import paramxml
+import script
+
+SCALAR_PARAMS = 40
+CURVES = 2
+
+
+def legacy_params_from_xml(params, element):
+    # codec before paramxml: shlex split and element by element dict for every indexed value
+    for e in element.findall('*'):
+        if e.tag == paramxml.PARAMS_TAG:
+            for e_param in e.findall('*'):
+                if e_param.tag == paramxml.PARAM_TAG:
+                    name = e_param.attrib.get(paramxml.PARAM_ATTR_NAME)
+                    vtype = paramxml.param_types.get(e_param.attrib.get(paramxml.PARAM_ATTR_TYPE), str)
+                    count = e_param.attrib.get(paramxml.PARAM_ATTR_INDEX_COUNT)
+                    start = e_param.attrib.get(paramxml.PARAM_ATTR_INDEX_START)
+                    if count is not None and start is not None:
+                        start = int(start)
+                        value = {'index_count': int(count), 'index_start': start}
+                        i = start
+                        for v in shlex.split(e_param.text):
+                            value[i] = vtype(v)
+                            i += 1
+                    else:
+                        value = vtype(e_param.text)
+                    params[name] = value
+
+
+def legacy_params_to_xml(params, parent):
+    # codec before paramxml: string concatenation for every indexed value
+    e_params = ET.SubElement(parent, paramxml.PARAMS_TAG)
+    for p in sorted(params):
+        attr = {paramxml.PARAM_ATTR_NAME: p}
+        value = params.get(p)
+        if paramxml.is_indexed(value):
+            start = value.get('index_start')
+            count = value.get('index_count')
+            attr[paramxml.PARAM_ATTR_INDEX_START] = str(start)
+            attr[paramxml.PARAM_ATTR_INDEX_COUNT] = str(count)
+            value_str = ''
+            value_type = None
+            for i in range(start, start + count):
+                v = value.get(i)
+                if value_type is None and v is not None:
+                    value_type = paramxml.param_types.get(type(v), paramxml.PARAM_TYPE_STR)
+                v_str = str(v)
+                if ' ' in v_str:
+                    v_str = '"%s"' % (v_str)
+                value_str += '%s ' % (v_str)
+        else:
+            value_type = paramxml.param_types.get(type(value), paramxml.PARAM_TYPE_STR)
+            value_str = str(value)
+        attr[paramxml.PARAM_ATTR_TYPE] = value_type
+        e_param = ET.SubElement(e_params, paramxml.PARAM_TAG, attrib=attr)
+        e_param.text = value_str
+    return e_params
+
+
+def generate(index, points):
+    params = {}
+    for i in range(SCALAR_PARAMS):
+        if i % 3 == 0:
+            params['eut.p%d' % i] = i * 1.5
+        elif i % 3 == 1:
+            params['eut.p%d' % i] = i
+        else:
+            params['eut.p%d' % i] = 'value %d' % i
+    for c in range(CURVES):
+        params['curve.v%d' % c] = paramxml.IndexedValue(points, 1, [(i + c) * .25 for i in range(points)])
+    params['curve.label'] = paramxml.IndexedValue(3, 0, ['point a', 'b', 'c'])
+    return script.ScriptConfig(name='test_%d' % index, script='curve', params=params)
+
+
+def run(label, configs, path, to_xml, from_xml):
+    start_time = time.time()
+    for i, config in enumerate(configs):
+        e = ET.Element(script.SCRIPT_CFG, attrib={'name': config.name, 'script': config.script})
+        to_xml(config.params, e)
+        f = open(os.path.join(path, '%s_%d.tst' % (label, i)), 'wb')
+        f.write(ET.tostring(e))
+        f.close()
+    save = time.time() - start_time
+
+    start_time = time.time()
+    loaded = []
+    for i in range(len(configs)):
+        params = {}
+        from_xml(params, ET.parse(os.path.join(path, '%s_%d.tst' % (label, i))).getroot())
+        loaded.append(params)
+    load = time.time() - start_time
+    print('{:<8} save {:6.2f} s  load {:6.2f} s  {:8.0f} configs/s'.format(label, save, load,
+                                                                           2 * len(configs) / (save + load)))
+    return loaded
+
+
+def main(count=300, points=1000):
+    print('{} configs, {} scalar params and {} curves of {} points each'.format(count, SCALAR_PARAMS, CURVES,
+                                                                              points))
+    configs = [generate(i, points) for i in range(count)]
+    path = tempfile.mkdtemp()
+    try:
+        run('legacy', configs, path, legacy_params_to_xml, legacy_params_from_xml)
+        loaded = run('paramxml', configs, path, paramxml.params_to_xml, paramxml.params_from_xml)
+        for config, params in zip(configs, loaded):
+            if params != config.params:
+                raise Exception('Round trip mismatch in %s' % (config.name))
+        print('round trip ok')
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
@@ -0,0 +1,96 @@
+"""
+Memory used by a synthetic 100k node result tree, held as the previous dict based Result nodes and as the current
+slotted result.Result nodes, both built and loaded back from a results file.
+
+    python testing/result_memory.py [tests]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import result as rslt
+
+FILES_PER_TEST = 4
+
+
+class DictResult(object):
+    # result node as it was before Result used slots: instance dict, own params dict and strings per node
+    def __init__(self, name=None, type=None, status=None, filename=None, params=None, result_path=None):
+        self.name = name
+        self.type = type
+        self.status = status
+        self.filename = filename
+        self.params = []
+        self.result_path = result_path
+        self.ref = None
+        self.results_index = 0
+        if params is not None:
+            self.params = params
+        else:
+            self.params = {}
+        self.results = []
+
+
+def copy_str(s):
+    # strings read from a results file are separate objects per node
+    return ''.join(list(s))
+
+
+def build(cls, tests):
+    root = cls(name='2018-01-01_00-00-00-000', type=copy_str(rslt.RESULT_TYPE_RESULT))
+    for i in range(tests):
+        status = rslt.RESULT_PASS if i % 10 else rslt.RESULT_FAIL
+        test = cls(name='test_%d' % i, type=copy_str(rslt.RESULT_TYPE_TEST), status=copy_str(status),
+                   params={copy_str('test.duration'): 1.5, copy_str('test.step'): i})
+        for j in range(FILES_PER_TEST):
+            params = None
+            if j == 0:
+                params = {copy_str('plot.title'): 'Power', copy_str('plot.x.points'): 'TIME',
+                          copy_str('plot.y.points'): 'AC_P'}
+            test.results.append(cls(name='file_%d' % j, type=copy_str(rslt.RESULT_TYPE_FILE),
+                                    filename='test_%d/file_%d.csv' % (i, j), params=params))
+        root.results.append(test)
+    return root
+
+
+def measure(label, func):
+    tracemalloc.start()
+    start_time = time.time()
+    tree = func()
+    elapsed = time.time() - start_time
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print('{:<28} {:8.1f} MB {:8.2f} s'.format(label, current / 1e6, elapsed))
+    return tree
+
+
+def main(tests=20000):
+    print('result tree: {} nodes'.format(1 + tests * (1 + FILES_PER_TEST)))
+    measure('dict nodes, built', lambda: build(DictResult, tests))
+    tree = measure('slotted nodes, built', lambda: build(rslt.Result, tests))
+
+    fd, filename = tempfile.mkstemp(suffix=rslt.RESULT_FILE_EXT)
+    os.close(fd)
+    try:
+        tree.to_xml_file(filename, pretty_print=False)
+        del tree
+
+        def load():
+            r = rslt.Result()
+            r.from_xml(filename=filename)
+            return r
+        measure('slotted nodes, from_xml', load)
+    finally:
+        os.remove(filename)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
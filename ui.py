@@ -38,19 +38,66 @@ import struct
 import hashlib
 import glob
 import multiprocessing
+import shutil
+import threading
+
+# import cost of each module, reported at startup when SVP_IMPORT_REPORT is set in the environment
+IMPORT_REPORT_ENV = 'SVP_IMPORT_REPORT'
+import_start_time = time.time()
+import_times = []
+
+def import_time(name, start_time):
+    import_times.append((name, time.time() - start_time))
+    if os.environ.get(IMPORT_REPORT_ENV) and wx_app is not None:
+        print ('import {}: {:.3f} s'.format(name, import_times[-1][1]))
+
+def import_report():
+    print ('module import times:')
+    for name, seconds in sorted(import_times, key=lambda t: t[1], reverse=True):
+        print ('  {:<24} {:.3f} s'.format(name, seconds))
+    print ('startup: {:.3f} s'.format(time.time() - import_start_time))
+
+class LazyModule(object):
+    """ Stand-in for a module that is only imported, by calling loader, the first time one of its attributes is
+    used. Loaders use plain import statements so that packaging tools still find the module.
+    """
+    def __init__(self, name, loader):
+        self._name = name
+        self._loader = loader
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            start_time = time.time()
+            self._module = self._loader()
+            import_time(self._name, start_time)
+        return getattr(self._module, attr)
+
+def load_numpy():
+    import numpy
+    return numpy
+
+def load_wxmplot():
+    import wxmplot
+    return wxmplot
+
+wx_app = None
+
+start_time = time.time()
 import wx
 import wx.adv
-import xlsxwriter
-
-import numpy
-import wxmplot
-import shutil
+import_time('wx', start_time)
 
+# only needed for plotting result files
+numpy = LazyModule('numpy', load_numpy)
+wxmplot = LazyModule('wxmplot', load_wxmplot)
 
+start_time = time.time()
 import app as svp
 import result as rslt
 import script
 import svptreectrl as treectrl
+import_time('app, result, script', start_time)
 
 '''
 import sunspec.core.util as util
@@ -62,8 +109,6 @@ import visa
 import openpyxl
 '''
 
-wx_app = None
-
 VERSION = '2.0.0'
 
 APP_NAME = 'SVP'
@@ -103,6 +148,12 @@ ITEM_OPEN_PREFIX = 'o_'
 ITEM_CLOSED_PREFIX = 'c_'
 ITEM_SUITE_MEMBERS = '__suite_members__'
 
+# csv result plots show at most this many points per horizontal pixel and refine after zooming stops for
+# PLOT_REFINE_DELAY ms
+PLOT_POINTS_PER_PIXEL = 2
+PLOT_WIDTH_MIN = 400
+PLOT_REFINE_DELAY = 200
+
 run_context_list = []
 
 def resource_path(relative_path):
@@ -325,6 +376,7 @@ class EditSuiteDialog(wx.Dialog):
         self.params = {}
         self.closed_panels = {}
         self.globals = True
+        self.workers = 1
 
         self.working_dir = os.path.join(entity.working_dir_path())
         path = entity.path()
@@ -468,6 +520,7 @@ class EditSuiteDialog(wx.Dialog):
         self.edit_params = {}
         row = 0
         row = self.render_globals(params_panel, row=row)
+        row = self.render_workers(params_panel, row=row)
         if self.suite.globals is True:
             self.render_group(params_panel, self.suite.param_defs, row)
         self.params = {}
@@ -653,6 +706,18 @@ class EditSuiteDialog(wx.Dialog):
         row += 1
         return row
 
+    def render_workers(self, params_panel, row=0, pad=0):
+        text = wx.StaticText(params_panel, -1, 'Parallel Workers')
+        text.Wrap(TEXT_WRAP)
+        text.SetToolTip(wx.ToolTip('Maximum number of suite members run concurrently'))
+        params_panel.panel_sizer.Add(text, pos=(row, 0), border=pad, flag=wx.LEFT | wx.ALIGN_CENTER_VERTICAL)
+        self.workers_entry = wx.SpinCtrl(params_panel, -1, name='workers', min=1, max=64,
+                                         initial=self.suite.workers)
+        self.workers_entry.Bind(wx.EVT_SPINCTRL, self.OnChangeWorkers)
+        params_panel.panel_sizer.Add(self.workers_entry, pos=(row, 1), border=0, flag=wx.LEFT)
+        row += 1
+        return row
+
     def render_param(self, params_panel, param, index=None, row=0, pad=0):
         if script.param_is_active(self.suite.param_defs, param.qname, self.param_value) is not None:
             if index is not None:
@@ -754,6 +819,7 @@ class EditSuiteDialog(wx.Dialog):
                 else:
                     self.params[name] = p.param_value()
         self.globals = self.suite.globals
+        self.workers = self.suite.workers
 
     def OnChange(self, evt):
         ctrl = evt.GetEventObject()
@@ -783,6 +849,10 @@ class EditSuiteDialog(wx.Dialog):
         # discard saved param values after re-rendering
         self.params = {}
 
+    def OnChangeWorkers(self, evt):
+        ctrl = evt.GetEventObject()
+        self.suite.workers = ctrl.GetValue()
+
     def OnDir(self, evt):
         button = evt.GetEventObject()
         path = wx.DirSelector()
@@ -987,7 +1057,7 @@ class EditParam(object):
         if index is not None:
             entry = self.indexed_entries.get(index)
             if entry is None:
-                if type(self.value) == dict:
+                if script.is_indexed(self.value):
                     value = self.value.get(index)
                     if value is None:
                         value = script.param_default.get(self.param.vtype)
@@ -1022,6 +1092,12 @@ class EditTestDialog(wx.Dialog):
         self.params = {}
         self.closed_panels = {}
         self.result = None
+        # param activity is evaluated through the dependency graph when it can be built
+        try:
+            self.param_graph = script.ScriptParamGraph(test_script.info.param_defs)
+        except script.ScriptParamError as e:
+            print ('Param dependency graph error: {}'.format(e))
+            self.param_graph = None
 
         self.open_image = wx.Image(os.path.join(images_path, 'open_64s.gif'), wx.BITMAP_TYPE_GIF)
         self.closed_image = wx.Image(os.path.join(images_path, 'closed_64s.gif'), wx.BITMAP_TYPE_GIF)
@@ -1063,6 +1139,8 @@ class EditTestDialog(wx.Dialog):
         params_panel.panel_sizer.Clear(delete_windows=True)
         params_panel.Hide()
         self.edit_params = {}
+        if self.param_graph is not None:
+            self.param_graph.evaluate(self.param_raw_value)
         row = 1
 
         text = wx.StaticText(params_panel, -1, 'Script')
@@ -1147,10 +1225,15 @@ class EditTestDialog(wx.Dialog):
 
         self.Layout()
 
+    def param_active(self, name):
+        if self.param_graph is not None:
+            return self.param_graph.is_active(name)
+        return script.param_is_active(self.test_script.param_defs, name, self.param_value) is not None
+
     def render_group(self, params_panel, group, row=0, pad=0, show=True):
         closed = self.closed_panels.get(group.qname)
         show = not closed
-        if script.param_is_active(self.test_script.param_defs, group.qname, self.param_value) is not None:
+        if self.param_active(group.qname):
             label_panel = None
             if group.name != script.SCRIPT_PARAM_ROOT:
                 label_panel = wx.Panel(params_panel, -1, name=group.qname)
@@ -1226,7 +1309,7 @@ class EditTestDialog(wx.Dialog):
         return row
 
     def render_param(self, params_panel, param, index=None, row=0, pad=0):
-        if script.param_is_active(self.test_script.param_defs, param.qname, self.param_value) is not None:
+        if self.param_active(param.qname):
             if index is not None:
                 edit_param = self.edit_params.get(param.qname)
                 if edit_param is None:
@@ -1278,6 +1361,18 @@ class EditTestDialog(wx.Dialog):
             # value.Bind(wx.EVT_CHOICE, self.OnChoice)
         return row
 
+    def param_raw_value(self, name):
+        # edited, saved or configured value without activity checks, the param graph applies those
+        p = self.edit_params.get(name)
+        if p is not None and p.index_count is None:
+            return p.param_value()
+        value = self.params.get(name)
+        if value is None:
+            value = self.test_script.params.get(name)
+        if value is None and self.test_script.config is not None:
+            value = self.test_script.config.params.get(name)
+        return value
+
     def param_value(self, name, index=None):
         p = self.edit_params.get(name)
         if p is not None:
@@ -1308,9 +1403,9 @@ class EditTestDialog(wx.Dialog):
                 # discard saved param values after re-rendering
                 self.params = {}
             '''
-            ### rerender always for now
-            # re-render params
-            self.render(self.params_panel)
+            # re-render params only when the change alters which params are shown
+            if self.param_graph is None or self.param_graph.update(p.param.qname, self.param_raw_value):
+                self.render(self.params_panel)
             # discard saved param values after re-rendering
             #### self.params = {}
 
@@ -1349,7 +1444,7 @@ class EditTestDialog(wx.Dialog):
     def update_params(self):
         #### self.params = {}
         for name, p in list(self.edit_params.items()):
-            if script.param_is_active(self.test_script.param_defs, name, self.param_value) is not None:
+            if self.param_active(name):
                 if p.index_count is not None:
                     value = {'index_count': p.index_count, 'index_start': p.index_start}
                     for key, v in list(p.indexed_entries.items()):
@@ -1522,10 +1617,10 @@ class EntityTree(treectrl.CustomTreeCtrl):
 
         self.entity_window.Bind(wx.EVT_CONTEXT_MENU, self.OnShowPopup)
         self.Bind(wx.EVT_TREE_SEL_CHANGED, self.OnSelectionChanged)
+        self.Bind(wx.EVT_TREE_ITEM_EXPANDING, self.OnExpanding)
         '''
         self.Bind(wx.EVT_TREE_ITEM_COLLAPSED, self.OnCollapsed)
         self.Bind(wx.EVT_TREE_ITEM_EXPANDED, self.OnExpanded)
-        self.Bind(wx.EVT_TREE_ITEM_EXPANDING, self.OnExpanding)
         '''
         self.Bind(wx.EVT_TREE_ITEM_ACTIVATED, self.OnItemActivated)
 
@@ -2192,7 +2287,7 @@ class EntityTreeEntry(object):
                 label =  '%s %s' % (param.label, index)
                 value = ''
                 values = param_value(param.qname)
-                if type(values) == dict:
+                if script.is_indexed(values):
                     value = str(values.get(index))
             else:
                 label = param.label
@@ -2224,6 +2319,17 @@ class EntityTreeEntry(object):
         row += 1
         return row
 
+    def render_workers(self, info_panel, workers=1, row=0, pad=0):
+        text = wx.StaticText(info_panel, -1, 'Parallel Workers')
+        text.Wrap(TEXT_WRAP)
+        text.SetToolTip(wx.ToolTip('Maximum number of suite members run concurrently'))
+        info_panel.panel_sizer.Add(text, pos=(row, 0), border=pad, flag=wx.LEFT)
+        text = wx.StaticText(info_panel, -1, str(workers))
+        text.Wrap(TEXT_WRAP)
+        info_panel.panel_sizer.Add(text, pos=(row, 1), border=0, flag=wx.LEFT)
+        row += 1
+        return row
+
     def render_info(self, parent):
         pass
 
@@ -2388,6 +2494,7 @@ class WorkingDirectory(Directory):
         self.entity_tree.entity_window.svp.remove_directory(self.name)
 
     def op_rescan(self, event):
+        script.script_info_cache_clear()
         self.rescan()
         svp.member_update(os.path.join(self.name, svp.SUITES_DIR), 'abc.ste', 'xyz.ste')
 
@@ -2534,25 +2641,18 @@ class ResultsDirectory(Directory):
     def scan(self):
         self.expanded = self.get_working_dir().is_expanded(self.working_dir_relative_name())
         try:
+            # runs are listed from the results catalog, each result file is only parsed when its entry is expanded
             path = os.path.join(os.path.join(*self.path()), self.name)
-            files = os.listdir(path)
-            if files is not None:
-                files.sort(reverse=True)
-            for f in files:
-                file_path = os.path.join(path, f)
-                name, ext = os.path.splitext(f)
-                if os.path.isdir(file_path):
-                    result_file = os.path.join(file_path, (name + svp.RESULTS_EXT))
-                    if os.path.isfile(result_file):
-                        try:
-                            result_entry = self.add_entry(name, ResultDirectoryEntry, entity_tree=self.entity_tree,
-                                                          image=self.entity_tree.images['result'], ordered=False)
-                            result_entry.result = rslt.Result()
-                            result_entry.result.from_xml(filename=result_file)
-                            result_entry.add_results(name)
-
-                        except Exception as e:
-                            raise UIError('Result directory scan error: %s' % str(e))
+            catalog = rslt.ResultCatalog(os.path.join(self.working_dir_path(), rslt.RESULT_CATALOG), path)
+            with catalog:
+                runs = catalog.sync()
+            for run in runs:
+                try:
+                    result_entry = self.add_entry(run['name'], ResultDirectoryEntry, entity_tree=self.entity_tree,
+                                                  image=self.entity_tree.images['result'], ordered=False)
+                    result_entry.run = run
+                except Exception as e:
+                    raise UIError('Result directory scan error: %s' % str(e))
         except Exception as e:
             raise UIError('Error scanning directory %s: %s' % (path, str(e)))
 
@@ -2570,6 +2670,8 @@ class ResultDirectoryEntry(EntityTreeEntry):
         EntityTreeEntry.__init__(self, name, entity_tree=entity_tree, parent=parent, image=image,
                                  status_image=status_image)
         self.ops = {OP_DELETE: (self.op_delete, None)}
+        # catalog entry for the run when the result tree has not been loaded yet
+        self.run = None
 
         fname, ext = os.path.splitext(name)
         if ext:
@@ -2617,6 +2719,19 @@ class ResultDirectoryEntry(EntityTreeEntry):
         path.append(self.name)
         return script.PATH_SEP.join(path)
 
+    def build(self, entity_tree, parent, selected=None):
+        EntityTreeEntry.build(self, entity_tree, parent, selected=selected)
+        if self.result is None and self.run is not None:
+            entity_tree.SetItemHasChildren(self.item, True)
+
+    def load_result(self):
+        if self.result is None:
+            result_file = os.path.join(*(self.path() + [self.name, self.name + svp.RESULTS_EXT]))
+            self.result = rslt.Result()
+            self.result.recover(filename=result_file)
+            self.add_results(self.name)
+        return self.result
+
     def add_results(self, result_name):
         show_status = False
         for result in self.result.results:
@@ -2637,21 +2752,116 @@ class ResultDirectoryEntry(EntityTreeEntry):
                                    image=self.entity_tree.images[result.type],
                                    status_image=status_image,
                                    allow_duplicate=True, ordered=False)
-            entry.expanded = True
+            # child results are added when the entry is expanded
             entry.result = result
             entry.result_name = result_name
-            entry.add_results(result_name)
 
     def expanding(self):
-        pass
-        '''
-        entry = self.entries[0]
-        print entry
-        if entry.result == None:
-            entry.result = rslt.Result()
-            entry.result.from_xml(filename=entry.absolute_filename())
-            entry.add_results()
-        '''
+        if self.result is None:
+            try:
+                self.load_result()
+                for e in self.entries:
+                    e.build(self.entity_tree, self.item)
+            except Exception as e:
+                wx.MessageBox('Error loading result %s: %s' % (self.name, str(e)), 'Result Error',
+                              wx.OK | wx.ICON_ERROR)
+
+class CsvPlot(object):
+    """ Plot of a csv result file in a wxmplot PlotFrame. The file is loaded off the GUI thread, a min/max
+    decimated view sized to the plot width is drawn first and the visible range is redrawn at full resolution,
+    or decimated again if still too large, when the x axis is zoomed or panned.
+    """
+    def __init__(self, frame, filename, title):
+        self.frame = frame
+        self.filename = filename
+        self.title = title
+        self.time = None
+        self.traces = []
+        self.x_range = None
+        self.refine_timer = None
+        # matplotlib holds callbacks weakly, the frame keeps the plot alive
+        frame.csv_plot = self
+
+    def load(self):
+        self.frame.SetTitle('%s (loading...)' % self.title)
+        thread = threading.Thread(target=self.load_thread)
+        thread.daemon = True
+        thread.start()
+
+    def load_thread(self):
+        try:
+            data = rslt.load_csv(self.filename, relative_value_names=[])
+            # first column is the time axis, relative to its first value
+            time_array = data.columns[0]
+            if time_array.dtype.kind == 'f' and len(time_array) > 0:
+                time_array = numpy.round(time_array - time_array[0], 2)
+            wx.CallAfter(self.loaded, data, time_array)
+        except Exception as e:
+            wx.CallAfter(self.load_error, e)
+
+    def load_error(self, e):
+        if self.frame:
+            self.frame.SetTitle('%s (error)' % self.title)
+            wx.MessageBox('Error loading %s: %s' % (self.filename, str(e)), 'Plot Error', wx.OK | wx.ICON_ERROR)
+
+    def loaded(self, data, time_array):
+        # frame may have been closed while loading
+        if not self.frame:
+            return
+        self.time = time_array
+        self.traces = [(data.names[i], data.columns[i]) for i in range(1, len(data.names))
+                       if data.columns[i].dtype.kind == 'f']
+        indices = self.view_indices(0, len(self.time))
+        for name, values in self.traces:
+            self.frame.oplot(self.time[indices], values[indices], label=name)
+        self.frame.SetTitle(self.title)
+        self.frame.panel.axes.callbacks.connect('xlim_changed', self.xlim_changed)
+
+    def view_points(self):
+        width = max(self.frame.panel.GetSize()[0], PLOT_WIDTH_MIN)
+        return width * PLOT_POINTS_PER_PIXEL
+
+    def view_indices(self, start, end):
+        """ Indices of the rows between start and end to draw, min/max decimated when there are more rows than
+        the plot can show.
+        """
+        points = self.view_points()
+        if end - start <= points:
+            return numpy.arange(start, end)
+        x = self.time[start:end]
+        if x.dtype.kind != 'f':
+            x = numpy.arange(start, end, dtype=float)
+        indices = [numpy.array([start, end - 1])]
+        for name, values in self.traces:
+            indices.append(start + rslt.decimate_minmax(x, values[start:end], points))
+        return numpy.unique(numpy.concatenate(indices))
+
+    def xlim_changed(self, axes):
+        # zooming generates a burst of limit changes, refine once they stop
+        self.x_range = axes.get_xlim()
+        if self.refine_timer is None:
+            self.refine_timer = wx.CallLater(PLOT_REFINE_DELAY, self.refine)
+        else:
+            self.refine_timer.Restart(PLOT_REFINE_DELAY)
+
+    def refine(self):
+        self.refine_timer = None
+        if not self.frame or self.x_range is None or len(self.time) == 0:
+            return
+        if self.time.dtype.kind == 'f':
+            # keep one point either side of the visible range so lines run to the plot edges
+            start = max(int(numpy.searchsorted(self.time, self.x_range[0])) - 1, 0)
+            end = min(int(numpy.searchsorted(self.time, self.x_range[1], side='right')) + 1, len(self.time))
+        else:
+            start = max(int(self.x_range[0]), 0)
+            end = min(int(self.x_range[1]) + 2, len(self.time))
+        if end - start < 2:
+            return
+        indices = self.view_indices(start, end)
+        for trace, (name, values) in enumerate(self.traces):
+            self.frame.panel.update_line(trace, self.time[indices], values[indices], update_limits=False)
+        self.frame.panel.canvas.draw_idle()
+
 
 class ResultEntry(EntityTreeEntry):
     def __init__(self, name, entity_tree=None, parent=None, image=None, status_image=-1):
@@ -2660,11 +2870,23 @@ class ResultEntry(EntityTreeEntry):
         self.ext = svp.RESULTS_EXT
         self.ops = {}
         self.result = None
+        self.result_name = None
 
         fname, ext = os.path.splitext(name)
         if ext:
             self.ext = ext
 
+    def build(self, entity_tree, parent, selected=None):
+        EntityTreeEntry.build(self, entity_tree, parent, selected=selected)
+        if not self.entries and self.result is not None and self.result.results:
+            entity_tree.SetItemHasChildren(self.item, True)
+
+    def expanding(self):
+        if not self.entries and self.result is not None and self.result.results:
+            self.add_results(self.result_name)
+            for e in self.entries:
+                e.build(self.entity_tree, self.item)
+
     def update_menu_ops(self, ops):
         submenu = None
         wd = self.get_working_dir()
@@ -2694,32 +2916,7 @@ class ResultEntry(EntityTreeEntry):
         if self.ext == svp.CSV_EXT:
             frame = wxmplot.PlotFrame()
             filename = os.path.join(self.working_dir_path(), svp.RESULTS_DIR, self.result_name, self.result.filename)
-            f = open(filename, 'r')
-            names = f.readline().split(',')
-            columns = len(names)
-            value_arrays = []
-            for i in range(columns):
-                value_arrays.append([])
-
-            base_time = None
-            for line in f:
-                values = line.split(',')
-                if base_time is None:
-                    base_time = float(values[0])
-                t = round(float(values[0]) - base_time, 2)
-                value_arrays[0].append(t)
-                for i in range(1, columns):
-                    try:
-                        v = float(values[i])
-                        value_arrays[i].append(v)
-                    except Exception as e:
-                        value_arrays[i].append('nan')
-                        pass
-
-            time_array = numpy.array(value_arrays[0])
-            for i in range(1, columns):
-                value_array = numpy.array(value_arrays[i])
-                frame.oplot(time_array, value_array, label=names[i])
+            CsvPlot(frame, filename, self.name).load()
 
             '''
             r = numpy.recfromcsv(filename, case_sensitive=True)
@@ -2738,7 +2935,6 @@ class ResultEntry(EntityTreeEntry):
             #            xlabel='x (mm)', ylabel='y1', ymin=-0.75, ymax=0.75)
             # pframe.oplot(x, y2, y2label='y2', side='right', ymin=0)
 
-            frame.SetTitle(self.name)
             frame.Show()
             # frame.ToggleWindowStyle(wx.STAY_ON_TOP)
         else:
@@ -2752,13 +2948,17 @@ class ResultEntry(EntityTreeEntry):
         return True
 
     def result_filename(self):
-        entity = self.parent
-        while entity and entity.result:
-            if entity.result.type == rslt.RESULT_TYPE_RESULT:
-                break
-            entity = entity.parent
+        # result_name is the name of the run the result belongs to
+        result_name = self.result_name
+        if result_name is None:
+            entity = self.parent
+            while entity and entity.result:
+                if entity.result.type == rslt.RESULT_TYPE_RESULT:
+                    break
+                entity = entity.parent
+            result_name = entity.result.name
 
-        filename = os.path.join(self.results_dir_path(), entity.result.name, self.result.filename)
+        filename = os.path.join(self.results_dir_path(), result_name, self.result.filename)
         return filename
 
     def relative_path(self):
@@ -2800,10 +3000,9 @@ class ResultEntry(EntityTreeEntry):
                                    image=image,
                                    status_image=status_image,
                                    allow_duplicate=True, ordered=False)
-            entry.expanded = True
+            # child results are added when the entry is expanded
             entry.result = result
             entry.result_name = result_name
-            entry.add_results(result_name)
 
     def render_info(self, info_window):
         limit = None
@@ -2912,32 +3111,7 @@ class ResultEntry(EntityTreeEntry):
 
             frame = wxmplot.PlotFrame()
             filename = os.path.join(self.working_dir_path(), svp.RESULTS_DIR, self.name)
-            f = open(filename, 'r')
-            names = f.readline().split(',')
-            columns = len(names)
-            value_arrays = []
-            for i in range(columns):
-                value_arrays.append([])
-
-            base_time = None
-            for line in f:
-                values = line.split(',')
-                if base_time is None:
-                    base_time = float(values[0])
-                t = round(float(values[0]) - base_time, 2)
-                value_arrays[0].append(t)
-                for i in range(1, columns):
-                    try:
-                        v = float(values[i])
-                        value_arrays[i].append(v)
-                    except Exception as e:
-                        value_arrays[i].append('nan')
-                        pass
-
-            time_array = numpy.array(value_arrays[0])
-            for i in range(1, columns):
-                value_array = numpy.array(value_arrays[i])
-                frame.oplot(time_array, value_array, label=names[i])
+            CsvPlot(frame, filename, self.name).load()
 
             '''
             r = numpy.recfromcsv(filename, case_sensitive=True)
@@ -2956,7 +3130,6 @@ class ResultEntry(EntityTreeEntry):
             #            xlabel='x (mm)', ylabel='y1', ymin=-0.75, ymax=0.75)
             # pframe.oplot(x, y2, y2label='y2', side='right', ymin=0)
 
-            frame.SetTitle(self.name)
             frame.Show()
             frame.ToggleWindowStyle(wx.STAY_ON_TOP)
 
@@ -3340,7 +3513,7 @@ class ScriptEntry(EntityTreeEntry):
         if script.param_is_active(param_defs, param.qname, param_value) is not None:
             if index is not None:
                 label =  '%s %s' % (param.label, index)
-                if type(param.default) == dict:
+                if script.is_indexed(param.default):
                     value = param.value.get(index)
                 else:
                     value = param.default
@@ -3492,6 +3665,7 @@ class SuiteEntry(EntityTreeEntry):
                 suite.members = dialog.members
                 suite.params = dialog.params
                 suite.globals = dialog.globals
+                suite.workers = dialog.workers
                 path = self.path() + [self.name + svp.SUITE_EXT]
                 path = os.path.join(*path)
                 suite.to_xml_file(filename=path)
@@ -3592,6 +3766,7 @@ class SuiteEntry(EntityTreeEntry):
         self.info_panel = params_panel
 
         row = self.render_globals(params_panel, globals=suite.globals, row=row)
+        row = self.render_workers(params_panel, workers=suite.workers, row=row)
         if suite.globals is True:
             self.render_group(params_panel, suite.param_defs, suite.param_value, suite.param_defs, row)
 
@@ -3766,6 +3941,7 @@ class TestEntry(EntityTreeEntry):
 
         self.test_script = script.load_script(path, lib_path, path_list = svp.extended_path_list)
         self.test_script.config = self.test_config
+        self.test_script.params_changed()
 
     def relative_path(self):
         path = []
@@ -3932,6 +4108,7 @@ class SuiteSuiteEntry(EntityTreeEntry):
             param_value = suite.param_value
 
         row = self.render_globals(params_panel, globals=suite.globals, row=row)
+        row = self.render_workers(params_panel, workers=suite.workers, row=row)
         if suite.globals is True:
             self.render_group(params_panel, suite.param_defs, param_value, suite.param_defs, row)
 
@@ -3987,6 +4164,7 @@ class SuiteTestEntry(EntityTreeEntry):
 
         self.test_script = script.load_script(path, lib_path, path_list = svp.extended_path_list)
         self.test_script.config = self.test_config
+        self.test_script.params_changed()
 
     def param_value(self, name):
         value = self.suite.param_value(name)
@@ -4163,10 +4341,6 @@ class ToolFrame(wx.Frame):
         self.entity_detail_sizer = wx.BoxSizer()
         self.entity_detail.SetSizer(self.entity_detail_sizer) ###
 
-        self.periodic_timer = wx.Timer(self)
-        self.Bind(wx.EVT_TIMER, self.periodic_timer_event, self.periodic_timer)
-        self.periodic_timer.Start(200)
-
     def create_menu_bar(self):
         ops = self.update_menu_ops()
         menu_bar = wx.MenuBar()
@@ -4276,16 +4450,8 @@ class ToolFrame(wx.Frame):
 
 
     def OnExit(self, evt):
-        self.periodic_timer.Stop()
         self.Close()
 
-    def periodic_timer_event(self, event):
-        # if self.svp is not None:
-        #     self.svp.periodic()
-        if run_context_list:
-            for rc in run_context_list:
-                rc.periodic()
-
 class PackageDialog(wx.Dialog):
     def __init__(self, parent, title):
         super(PackageDialog, self).__init__(parent, title=title, size=(300, 200))
@@ -4343,7 +4509,7 @@ class ResultPanel(wx.Panel):
         else:
             result_file = os.path.join(result_dir, (result_name + svp.RESULTS_EXT))
             self.result = rslt.Result()
-            self.result.from_xml(filename=result_file)
+            self.result.recover(filename=result_file)
 
         self.image_list = wx.ImageList(16, 16, True)
         self.images = {}
@@ -4721,6 +4887,15 @@ class RunPanel(wx.Panel):
         self.info_log.AppendText(' %s  %s\n' % (level, message))
         self.info_log.SetDefaultStyle(wx.TextAttr(wx.BLACK))
 
+    def log_batch(self, entries):
+        # single repaint for the whole batch
+        self.info_log.Freeze()
+        try:
+            for timestamp, level, message in entries:
+                self.log(timestamp, level, message)
+        finally:
+            self.info_log.Thaw()
+
 
 class RunTree(treectrl.CustomTreeCtrl):
 
@@ -4788,6 +4963,8 @@ class RunTree(treectrl.CustomTreeCtrl):
         # self.EnableChildren(self.root, False)
         self.SetSelectable(False)
         self.run_context.run()
+        # run context is serviced on the GUI thread whenever a worker has something to report
+        self.run_context.supervise(wx.CallAfter)
 
     def complete(self):
         self.running = False
@@ -4993,7 +5170,7 @@ class RunContext(svp.RunContext):
         svp.RunContext.add_result(self, result)
 
     def update_result(self, name=None, status=None, filename=None, params=None):
-        if self.status != rslt.RESULT_STOPPED:
+        if self.active_result.status != rslt.RESULT_STOPPED:
             if status is not None:
                 self.run_tree.panel.update(status)
             self.active_result.ref.update(name=name, status=status)
@@ -5003,6 +5180,9 @@ class RunContext(svp.RunContext):
         self.run_tree.panel.log(timestamp, level, message)
         # svp.RunContext.log(self, timestamp, level, message)
 
+    def log_batch(self, entries):
+        self.run_tree.panel.log_batch(entries)
+
     def alert(self, message):
         wx.MessageBox(message, caption='Alert', style=wx.OK | wx.ICON_ERROR)
 
@@ -5078,6 +5258,8 @@ class Tool(object):
                 self.frm = ToolFrame(None, APP_LABEL, 111)
                 # self.frm.ToggleWindowStyle(wx.STAY_ON_TOP)
                 self.frm.Show()
+                if os.environ.get(IMPORT_REPORT_ENV):
+                    import_report()
                 self.wx_app.SetTopWindow(self.frm)
 
                 self.wx_app.MainLoop()